@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'task', 'status', 'priority', 'attempts', 'run_at', 'latency'
+    )
+    list_filter = ('status', 'task')
+    readonly_fields = ('latency',)
+    empty_value_display = '-пусто-'
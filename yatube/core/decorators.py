@@ -0,0 +1,49 @@
+import functools
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше SQL-запросов, чем заявлено."""
+
+
+class QueryCounter:
+    """execute_wrapper, считающий выполненные запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def query_budget(limit):
+    """
+    Ограничивает число SQL-запросов представления вместе с рендером шаблона.
+
+    Превышение пишется в лог, а при QUERY_BUDGET_STRICT = True
+    вызывает QueryBudgetExceeded.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = view(request, *args, **kwargs)
+            if counter.count > limit:
+                message = (
+                    f'{view.__name__}: {counter.count} SQL-запросов '
+                    f'при бюджете {limit}'
+                )
+                if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
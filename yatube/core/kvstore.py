@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.cached_db_kvstore import \
+    KVStore as CachedDBKVStore
+
+
+class LRU:
+    """Потокобезопасный LRU-словарь процесса с ограниченным сроком жизни."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + self.timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class KVStore(CachedDBKVStore):
+    """
+    Хранилище метаданных sorl-thumbnail в три уровня: LRU процесса,
+    кеш проекта (THUMBNAIL_CACHE) и таблица sorl в базе данных.
+
+    Запросы к базе идут только при промахе обоих кешей, а база
+    сохраняет метаданные между перезапусками. В LRU попадают только
+    найденные значения, поэтому миниатюра, созданная другим процессом,
+    будет найдена им при следующем обращении. Срок жизни записей LRU
+    (THUMBNAIL_LRU_TIMEOUT) ограничивает время, в течение которого
+    процесс не замечает удаления миниатюры в другом процессе.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lru = LRU(
+            settings.THUMBNAIL_LRU_SIZE, settings.THUMBNAIL_LRU_TIMEOUT
+        )
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.lru.clear()
+
+    def _get_raw(self, key):
+        value = self.lru.get(key)
+        if value is None:
+            value = super()._get_raw(key)
+            if value is not None:
+                self.lru.set(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self.lru.delete(*keys)
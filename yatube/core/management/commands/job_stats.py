@@ -0,0 +1,40 @@
+import statistics
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает размер очереди по состояниям и задержку запуска '
+        'задач за последние часы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=1)
+
+    def handle(self, *args, **options):
+        for row in Job.objects.values('status').annotate(
+            count=Count('id')
+        ).order_by('status'):
+            self.stdout.write(f'{row["status"]:<8} {row["count"]}')
+        since = timezone.now() - timedelta(hours=options['hours'])
+        jobs = Job.objects.filter(started__gte=since).values_list(
+            'task', 'started', 'run_at'
+        )
+        latencies = {}
+        for task, started, run_at in jobs.iterator():
+            latencies.setdefault(task, []).append(
+                (started - run_at).total_seconds() * 1000
+            )
+        self.stdout.write('task  jobs  latency_p50_ms  latency_p95_ms')
+        for task, timings in sorted(latencies.items()):
+            timings.sort()
+            self.stdout.write('{}  {}  {:.1f}  {:.1f}'.format(
+                task, len(timings), statistics.median(timings),
+                timings[max(int(len(timings) * 0.95) - 1, 0)]
+            ))
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи из очереди core.tasks. Можно запускать '
+        'несколько процессов одновременно. Раз в TASKS_PRUNE_INTERVAL '
+        'секунд удаляет выполненные задачи старше TASKS_RETENTION.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Завершиться, когда очередь опустеет.')
+        parser.add_argument('--name', default=None,
+                            help='Имя обработчика в записях задач.')
+
+    def handle(self, *args, **options):
+        worker = options['name'] or tasks.worker_name()
+        self.stdout.write(f'Обработчик {worker} запущен')
+        pruned_at = None
+        try:
+            while True:
+                done = tasks.run_pending(worker)
+                if done:
+                    self.stdout.write(f'Выполнено задач: {done}')
+                if pruned_at is None or (
+                    time.monotonic() - pruned_at
+                    >= settings.TASKS_PRUNE_INTERVAL
+                ):
+                    pruned = tasks.prune()
+                    pruned_at = time.monotonic()
+                    if pruned:
+                        self.stdout.write(f'Удалено задач: {pruned}')
+                if options['burst']:
+                    return
+                time.sleep(settings.TASKS_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            self.stdout.write(f'Обработчик {worker} остановлен')
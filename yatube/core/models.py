@@ -10,3 +10,76 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(CreatedModel):
+    """Отложенная задача очереди core.tasks."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    task = models.CharField(
+        'Задача',
+        max_length=200,
+        help_text='Путь импорта функции задачи'
+    )
+    args = models.TextField(
+        'Аргументы',
+        default='[]',
+        help_text='Позиционные аргументы в JSON'
+    )
+    priority = models.SmallIntegerField(
+        'Приоритет',
+        default=0,
+        help_text='Задачи с большим приоритетом выполняются раньше'
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток')
+    run_at = models.DateTimeField('Запланирована на')
+    started = models.DateTimeField('Начало', null=True, blank=True)
+    finished = models.DateTimeField('Окончание', null=True, blank=True)
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    locked_until = models.DateTimeField(
+        'Занята до',
+        null=True,
+        blank=True,
+        help_text='После этого времени задачу может забрать другой обработчик'
+    )
+    error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_claim_idx'
+            ),
+            models.Index(
+                fields=['status', 'locked_until'],
+                name='job_lease_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+    @property
+    def latency(self):
+        """Ожидание в очереди от планового времени до начала попытки."""
+        if self.started:
+            return self.started - self.run_at
+        return None
@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .tasks import task
+
+HEADER = 'Surrogate-Key'
+PAGE_KEY = 'page-cache:{}'
+TAG_KEY = 'surrogate-key:{}'
+
+
+def add_keys(response, keys):
+    """Добавляет ответу суррогатные ключи в заголовок Surrogate-Key."""
+    current = response.get(HEADER, '').split()
+    response[HEADER] = ' '.join(sorted(set(current) | set(keys)))
+    return response
+
+
+def _tag_versions(tags, create=False):
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    if create:
+        missing = {
+            key: time.time_ns() for key in keys if key not in found
+        }
+        if missing:
+            cache.set_many(missing, timeout=None)
+            versions.update({keys[key]: v for key, v in missing.items()})
+    return versions
+
+
+def cache_anonymous(view):
+    """
+    Кеширует целиком ответы представления для анонимных GET-запросов.
+
+    Запись привязана к версиям суррогатных ключей ответа и считается
+    устаревшей, как только любой из них очищен через purge().
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or (
+            request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+        key = PAGE_KEY.format(
+            hashlib.md5(request.get_full_path().encode()).hexdigest()
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            response, versions = entry
+            if _tag_versions(versions) == versions:
+                response['X-Cache'] = 'HIT'
+                return response
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.cookies:
+            tags = response.get(HEADER, '').split()
+            response['Surrogate-Control'] = (
+                f'max-age={settings.PAGE_CACHE_TIMEOUT}'
+            )
+            cache.set(
+                key,
+                (response, _tag_versions(tags, create=True)),
+                settings.PAGE_CACHE_TIMEOUT
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def _purge(keys):
+    cache.set_many(
+        {TAG_KEY.format(key): time.time_ns() for key in keys},
+        timeout=None
+    )
+
+
+@task(priority=10)
+def purge_remote(keys):
+    """
+    Отправляет внешним прокси запрос PURGE с ключами keys.
+    Ошибка соединения оставляет задачу в очереди для повтора.
+    """
+    for url in settings.SURROGATE_PURGE_URLS:
+        requests.request(
+            'PURGE', url,
+            headers={HEADER: ' '.join(sorted(keys))},
+            timeout=settings.SURROGATE_PURGE_TIMEOUT
+        )
+
+
+def purge(*keys):
+    """
+    Очищает страницы с суррогатными ключами keys.
+
+    Локальный кеш очищается сразу и ещё раз после фиксации транзакции,
+    чтобы страница, собранная параллельным запросом из незафиксированных
+    данных, не осталась в кеше. Запрос PURGE внешним прокси из
+    SURROGATE_PURGE_URLS ставится в очередь задач.
+    """
+    keys = set(keys)
+    _purge(keys)
+    transaction.on_commit(lambda: _purge(keys))
+    if settings.SURROGATE_PURGE_URLS:
+        purge_remote.delay(sorted(keys))
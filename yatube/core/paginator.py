@@ -0,0 +1,168 @@
+import heapq
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор по паре (key, tiebreaker).
+
+    Страница выбирается условием по ключу последней показанной записи,
+    поэтому запрос стоит одинаково на первой и на любой дальней странице
+    и не требует COUNT(*). Нумерованные страницы по-прежнему доступны
+    через get_page() для старых ссылок вида ?page=N.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date',
+                 tiebreaker='id', descending=True, **kwargs):
+        self.key = key
+        self.tiebreaker = tiebreaker
+        self.descending = descending
+        super().__init__(self._order(object_list), per_page, **kwargs)
+
+    def _order(self, queryset):
+        direction = '-' if self.descending else ''
+        return queryset.order_by(
+            f'{direction}{self.key}', f'{direction}{self.tiebreaker}'
+        )
+
+    def encode_cursor(self, obj):
+        return self._encode(
+            getattr(obj, self.key), getattr(obj, self.tiebreaker)
+        )
+
+    def _encode(self, value, pk):
+        return urlsafe_base64_encode(f'{value.isoformat()}|{pk}'.encode())
+
+    def decode_cursor(self, cursor):
+        """Возвращает (key, tiebreaker) или None для битого курсора."""
+        try:
+            value, pk = urlsafe_base64_decode(cursor).decode().split('|')
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            return None
+        if value is None:
+            return None
+        return value, pk
+
+    def normalize_cursor(self, cursor):
+        """Курсор в каноническом виде или None для пустого и битого."""
+        decoded = cursor and self.decode_cursor(cursor)
+        return self._encode(*decoded) if decoded else None
+
+    def _beyond(self, cursor, forward):
+        """Условие «записи дальше курсора» в направлении выдачи."""
+        value, pk = cursor
+        lookup = 'lt' if forward == self.descending else 'gt'
+        return (
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{self.key: value, f'{self.tiebreaker}__{lookup}': pk})
+        )
+
+    def _slice_queryset(self, queryset, cursor, forward):
+        """Первые per_page + 1 записей за курсором в заданном направлении."""
+        if cursor:
+            queryset = queryset.filter(self._beyond(cursor, forward))
+        if not forward:
+            queryset = queryset.reverse()
+        return list(queryset[:self.per_page + 1])
+
+    def _slice(self, cursor, forward):
+        return self._slice_queryset(self.object_list, cursor, forward)
+
+    def cursor_page(self, after=None, before=None):
+        """
+        Страница записей, идущих после курсора after
+        (или перед курсором before) в порядке выдачи.
+        Без курсоров возвращает первую страницу.
+        """
+        after = after and self.decode_cursor(after)
+        before = before and self.decode_cursor(before)
+        if before:
+            items = self._slice(before, forward=False)
+        else:
+            items = self._slice(after, forward=True)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if before:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+        page = Page(items, None, self)
+        self._attach_cursors(page, has_next, has_previous)
+        return page
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        self._attach_cursors(page, page.has_next(), page.has_previous())
+        return page
+
+    def _attach_cursors(self, page, has_next, has_previous):
+        items = page.object_list
+        page.next_cursor = (
+            self.encode_cursor(items[len(items) - 1])
+            if has_next and items else None
+        )
+        page.previous_cursor = (
+            self.encode_cursor(items[0])
+            if has_previous and items else None
+        )
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Keyset-пагинатор поверх нескольких querysets с общим ключом.
+
+    Каждый источник отдаёт не больше per_page + 1 записей за курсором,
+    результаты сливаются в общий порядок. Записи с одинаковым
+    tiebreaker считаются дубликатами и выводятся один раз.
+    """
+
+    def __init__(self, sources, per_page, **kwargs):
+        super().__init__(sources[0], per_page, **kwargs)
+        self.sources = [self._order(queryset) for queryset in sources]
+
+    def _merge(self, parts, forward):
+        merged = heapq.merge(
+            *parts,
+            key=lambda obj: (
+                getattr(obj, self.key), getattr(obj, self.tiebreaker)
+            ),
+            reverse=forward == self.descending
+        )
+        seen = set()
+        items = []
+        for obj in merged:
+            pk = getattr(obj, self.tiebreaker)
+            if pk not in seen:
+                seen.add(pk)
+                items.append(obj)
+        return items
+
+    def _slice(self, cursor, forward):
+        parts = [
+            self._slice_queryset(source, cursor, forward)
+            for source in self.sources
+        ]
+        return self._merge(parts, forward)[:self.per_page + 1]
+
+    @cached_property
+    def count(self):
+        """Оценка сверху: дубликаты между источниками не вычитаются."""
+        return sum(source.count() for source in self.sources)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        top = number * self.per_page
+        items = self._merge(
+            [list(source[:top]) for source in self.sources], forward=True
+        )
+        return self._get_page(
+            items[top - self.per_page:top], number, self
+        )
@@ -0,0 +1,62 @@
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Файл «posts/photo.jpg» сохраняется как «posts/ab/abcdef….jpg»;
+    повторная загрузка того же содержимого не пишет ничего и возвращает
+    имя уже сохранённого файла. Содержимое по имени никогда не меняется,
+    поэтому такие адреса можно кешировать бессрочно. Удалять файл можно
+    только когда на него не ссылается ни одна запись (см. posts.images).
+
+    Сохранение и удаление одного имени выполняются под блокировкой lock().
+    Повторная загрузка обновляет время изменения файла: по нему удаление
+    откладывается, пока запись с новой ссылкой может быть не зафиксирована.
+    """
+    # Файлы блокировок: по одному на первые два символа хеша.
+    LOCK_DIRECTORY = '.locks'
+
+    @contextmanager
+    def lock(self, name):
+        """Межпроцессная блокировка имени на время сохранения или удаления."""
+        digest = os.path.basename(name)[:2]
+        directory = os.path.join(self.location, self.LOCK_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{digest}.lock'), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        with self.lock(name):
+            if self.exists(name):
+                if self.size(name) == content.size:
+                    os.utime(self.path(name))
+                    return name
+                # Недописанный файл: сохраняем содержимое заново.
+                super().delete(name)
+            return super()._save(name, content)
+
+
+content_storage = ContentAddressedStorage()
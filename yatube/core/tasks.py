@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args, priority=0, delay=0, max_attempts=None):
+    """
+    Ставит задачу task (путь импорта функции) в очередь.
+
+    Запись создаётся после фиксации текущей транзакции, поэтому задача
+    не увидит незафиксированных данных и не выполнится для отменённых.
+    Аргументы должны сериализоваться в JSON.
+    """
+    payload = json.dumps(args)
+
+    def create():
+        Job.objects.create(
+            task=task,
+            args=payload,
+            priority=priority,
+            max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+    transaction.on_commit(create)
+
+
+def task(func=None, **defaults):
+    """
+    Декоратор функции-задачи. Добавляет ей метод delay(*args, **options),
+    который ставит вызов в очередь с параметрами enqueue() по умолчанию
+    из defaults. Сама функция по-прежнему вызывается синхронно.
+    """
+    if func is None:
+        return lambda func: task(func, **defaults)
+    path = f'{func.__module__}.{func.__qualname__}'
+
+    def delay(*args, **options):
+        enqueue(path, *args, **{**defaults, **options})
+    func.delay = delay
+    return func
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """
+    Забирает следующую задачу для обработчика worker или возвращает None.
+
+    Кандидаты — готовые задачи из очереди и задачи, чья аренда истекла
+    (обработчик упал); их выбирают два запроса по индексам job_claim_idx
+    и job_lease_idx и сливают в общем порядке приоритета. Задача
+    переводится в работу условным UPDATE по прежним состоянию и числу
+    попыток, поэтому из нескольких процессов её получит ровно один,
+    без блокировки таблицы.
+    """
+    now = timezone.now()
+    fields = ('pk', 'priority', 'run_at', 'status', 'attempts')
+    batch = settings.TASKS_CLAIM_BATCH
+    queued = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at', 'id').values_list(*fields)[:batch]
+    expired = Job.objects.filter(
+        status=Job.RUNNING, locked_until__lt=now
+    ).values_list(*fields)[:batch]
+    candidates = sorted(
+        [*queued, *expired], key=lambda job: (-job[1], job[2], job[0])
+    )[:batch]
+    for pk, _, _, status, attempts in candidates:
+        claimed = Job.objects.filter(
+            pk=pk, status=status, attempts=attempts
+        ).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            started=now,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=settings.TASKS_LEASE),
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job, worker):
+    """
+    Выполняет захваченную задачу и записывает результат.
+    Неудачная попытка откладывается с экспоненциальной задержкой,
+    после max_attempts попыток задача помечается ошибочной.
+    """
+    owned = Job.objects.filter(pk=job.pk, locked_by=worker)
+    if job.attempts > job.max_attempts:
+        owned.update(status=Job.FAILED, finished=timezone.now())
+        return False
+    try:
+        import_string(job.task)(*json.loads(job.args))
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        logger.warning('Задача %s завершилась ошибкой:\n%s', job, error)
+        if job.attempts >= job.max_attempts:
+            owned.update(status=Job.FAILED, finished=now, error=error)
+        else:
+            backoff = settings.TASKS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            owned.update(
+                status=Job.QUEUED,
+                run_at=now + timedelta(seconds=backoff),
+                locked_by='',
+                locked_until=None,
+                error=error,
+            )
+        return False
+    owned.update(status=Job.DONE, finished=timezone.now())
+    logger.info('Задача %s выполнена, ожидание %s', job, job.latency)
+    return True
+
+
+def run_pending(worker=None):
+    """Выполняет все готовые к запуску задачи, возвращает их число."""
+    worker = worker or worker_name()
+    count = 0
+    while True:
+        close_old_connections()
+        job = claim(worker)
+        if job is None:
+            return count
+        run(job, worker)
+        count += 1
+
+
+def prune():
+    """
+    Удаляет выполненные задачи, закончившиеся раньше чем TASKS_RETENTION
+    секунд назад. Удаление идёт пачками по TASKS_PRUNE_BATCH, чтобы
+    не держать долгую блокировку. Возвращает число удалённых задач.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.TASKS_RETENTION)
+    old = Job.objects.filter(status=Job.DONE, finished__lt=cutoff)
+    total = 0
+    while True:
+        pks = list(
+            old.values_list('pk', flat=True)[:settings.TASKS_PRUNE_BATCH]
+        )
+        if not pks:
+            return total
+        total += Job.objects.filter(pk__in=pks).delete()[0]
@@ -1,4 +1,10 @@
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+# Год: имена медиафайлов зависят от содержимого (core.storage),
+# поэтому файл по одному адресу никогда не меняется.
+MEDIA_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def page_not_found(request, exception):
@@ -15,3 +21,13 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def media(request, path, document_root=None):
+    """Раздача медиафайлов при DEBUG с заголовками бессрочного кеширования."""
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200:
+        patch_cache_control(
+            response, public=True, max_age=MEDIA_MAX_AGE, immutable=True
+        )
+    return response
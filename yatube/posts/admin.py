@@ -1,19 +1,58 @@
 from django.contrib import admin
 
+from . import exporter, search
 from .models import Comment, Follow, Group, Post
 
 
+class IndexedSearchMixin:
+    """
+    Поиск по поисковому индексу (posts.search) вместо LIKE '%...%'
+    по search_fields. Показываются не больше SEARCH_LIMIT лучших совпадений.
+    """
+    SEARCH_LIMIT = 1000
+    search_ids = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = self.search_ids(search_term, limit=self.SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_ids = staticmethod(search.post_ids)
+    actions = ('export_jsonl', 'export_csv', 'export_zip')
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def export(self, queryset, **options):
+        return exporter.export_response(
+            'yatube-posts',
+            posts=queryset,
+            comments=Comment.objects.filter(post__in=queryset.values('pk')),
+            **options
+        )
+
+    def export_jsonl(self, request, queryset):
+        return self.export(queryset, format='jsonl')
+    export_jsonl.short_description = 'Выгрузить в JSONL с комментариями'
+
+    def export_csv(self, request, queryset):
+        return self.export(queryset, format='csv')
+    export_csv.short_description = 'Выгрузить в CSV с комментариями'
+
+    def export_zip(self, request, queryset):
+        return self.export(queryset, format='jsonl', images=True)
+    export_zip.short_description = 'Выгрузить в zip с картинками'
+
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_ids = staticmethod(search.comment_ids)
     list_display = ('pk', 'created', 'author', 'post', 'text')
     search_fields = ('text',)
     empty_value_display = '-пусто-'
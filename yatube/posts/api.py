@@ -0,0 +1,192 @@
+"""
+JSON API только для чтения: те же ленты и посты, что и HTML-страницы.
+
+Параметр fields=id,text,... выбирает поля ответа и загружает из базы
+только их (QuerySet.only()). Списки листаются курсорами ?after=/?before=,
+посты по списку id отдаются одним запросом: ?ids=1,2,3.
+Кеширование и условный GET устроены так же, как у страниц.
+"""
+import functools
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from core import page_cache
+from core.decorators import query_budget
+from core.paginator import CursorPaginator
+
+from . import cache
+from .models import Group, Post, User
+from .utils import POST_LIMIT
+
+# Поле ответа: (поля модели для only(), связь для select_related, значение).
+FIELDS = {
+    'id': (('id',), None, lambda post: post.pk),
+    'text': (('text',), None, lambda post: post.text),
+    'pub_date': (('pub_date',), None, lambda post: post.pub_date.isoformat()),
+    'updated_at': (
+        ('updated_at',), None, lambda post: post.updated_at.isoformat()
+    ),
+    'author': (
+        ('author__username',), 'author', lambda post: post.author.username
+    ),
+    'group': (
+        ('group__slug',), 'group',
+        lambda post: post.group.slug if post.group else None
+    ),
+    'image': (
+        ('image',), None,
+        lambda post: post.image.url if post.image else None
+    ),
+    'image_width': (('image_width',), None, lambda post: post.image_width),
+    'image_height': (('image_height',), None, lambda post: post.image_height),
+    'comments_count': (
+        ('comments_count',), None, lambda post: post.comments_count
+    ),
+}
+DEFAULT_FIELDS = (
+    'id', 'text', 'pub_date', 'author', 'group', 'image', 'comments_count'
+)
+# Поля, без которых не построить курсор страницы и ключи кеша.
+KEY_FIELDS = ('id', 'pub_date', 'author', 'group')
+IDS_LIMIT = 100
+
+
+class BadRequest(ValueError):
+    """Неверные параметры запроса к API."""
+
+
+def error(message, status=400):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = set(fields) - FIELDS.keys()
+    if unknown or not fields:
+        raise BadRequest(
+            'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            if unknown else 'Не указаны поля'
+        )
+    return fields
+
+
+def parse_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in value.split(',') if pk))
+    except ValueError:
+        raise BadRequest('ids — список целых чисел через запятую')
+    if not ids or len(ids) > IDS_LIMIT:
+        raise BadRequest(f'ids — от 1 до {IDS_LIMIT} значений')
+    return ids
+
+
+def select(queryset, fields):
+    """Загружает из базы только поля, нужные для ответа."""
+    columns = set(KEY_FIELDS)
+    related = set()
+    for name in fields:
+        model_fields, relation, _ = FIELDS[name]
+        columns.update(model_fields)
+        if relation:
+            related.add(relation)
+    return queryset.select_related(*related).only(*columns)
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name][2](post) for name in fields}
+
+
+def api_view(version, budget):
+    """Декораторы представления API: условный GET, кеш, бюджет запросов."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except BadRequest as exc:
+                return error(str(exc))
+        return require_safe(cache.conditional(version)(
+            page_cache.cache_anonymous(query_budget(budget)(wrapper))
+        ))
+    return decorator
+
+
+def response_keys(posts, *keys):
+    """
+    Суррогатные ключи ответа: ключи постов и их комментариев,
+    ведь ответ содержит comments_count.
+    """
+    result = cache.page_keys(posts, *keys)
+    result.update(f'comments-{post.pk}' for post in posts)
+    return result
+
+
+def post_list(request, queryset, *keys):
+    fields = parse_fields(request.GET.get('fields'))
+    paginator = CursorPaginator(select(queryset, fields), POST_LIMIT)
+    page = paginator.cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    response = JsonResponse({
+        'results': [serialize(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+    return page_cache.add_keys(response, response_keys(page, *keys))
+
+
+@api_view(cache.with_comments(cache.index_version), 2)
+def posts(request):
+    """Лента всех постов или посты по списку ?ids=."""
+    if 'ids' not in request.GET:
+        return post_list(request, Post.objects.all(), 'feed')
+    fields = parse_fields(request.GET.get('fields'))
+    ids = parse_ids(request.GET['ids'])
+    found = select(Post.objects.all(), fields).in_bulk(ids)
+    response = JsonResponse({
+        'results': [
+            serialize(found[pk], fields) for pk in ids if pk in found
+        ],
+        'missing': [pk for pk in ids if pk not in found],
+    })
+    return page_cache.add_keys(
+        response, response_keys(found.values(), 'feed')
+    )
+
+
+@api_view(cache.with_comments(cache.group_version), 3)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only('id').first()
+    if group is None:
+        return error('Группа не найдена', status=404)
+    return post_list(
+        request, group.posts.all(),
+        f'group-{group.pk}', f'group-{group.pk}-list'
+    )
+
+
+@api_view(cache.with_comments(cache.author_version), 3)
+def author_posts(request, username):
+    author = User.objects.filter(username=username).only('id').first()
+    if author is None:
+        return error('Автор не найден', status=404)
+    return post_list(
+        request, author.posts.all(),
+        f'author-{author.pk}', f'author-{author.pk}-list'
+    )
+
+
+@api_view(cache.post_version, 2)
+def post_detail(request, post_id):
+    fields = parse_fields(request.GET.get('fields'))
+    post = select(Post.objects.all(), fields).filter(pk=post_id).first()
+    if post is None:
+        return error('Пост не найден', status=404)
+    response = JsonResponse(serialize(post, fields))
+    return page_cache.add_keys(response, response_keys([post]))
@@ -0,0 +1,219 @@
+import functools
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+from .models import Group, Post, User
+
+VERSION_KEY = 'feed-version:{}'
+# Поля пользователя, которые выводят страницы. Остальные поля (пароль,
+# email, права) не загружаются в объекты, попадающие в кеш.
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def feed_version(*scopes):
+    """
+    Сводная версия закешированных фрагментов лент для набора областей.
+
+    Области: 'posts', 'groups', 'users', 'comments', 'group:<slug>',
+    'author:<username>', 'post:<id>'.
+    Области групп и авторов названы по адресу страницы, чтобы версию
+    можно было получить до обращения к базе.
+    Версии хранятся в кеше бессрочно; потерянная версия получает новое
+    значение, поэтому старые фрагменты под ней больше не найдутся.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump(*scopes):
+    """Обновляет версии областей после фиксации транзакции."""
+    def set_versions():
+        version = time.time_ns()
+        cache.set_many(
+            {VERSION_KEY.format(scope): version for scope in scopes},
+            timeout=None
+        )
+    transaction.on_commit(set_versions)
+
+
+def index_version():
+    return feed_version('posts', 'groups', 'users')
+
+
+def group_version(slug):
+    return feed_version(f'group:{slug}', 'groups', 'users')
+
+
+def author_version(username):
+    return feed_version(f'author:{username}', 'groups', 'users')
+
+
+def with_comments(version):
+    """
+    Версия списка, который выводит число комментариев постов:
+    к версии ленты добавляется область 'comments'.
+    """
+    @functools.wraps(version)
+    def wrapper(*args, **kwargs):
+        comments = feed_version('comments')
+        return f'{version(*args, **kwargs)}.{comments}'
+    return wrapper
+
+
+def post_version(post_id):
+    """
+    Версия страницы поста: сам пост с комментариями, группы, имена
+    пользователей и область автора (в ней меняется число его постов).
+    Публикации других авторов страницу не устаревают. Область автора
+    берётся из кеша под версией поста и обновляется вместе с ней.
+    """
+    version = feed_version(f'post:{post_id}', 'groups', 'users')
+    scopes = get_or_set(
+        'post-scopes', version, [post_id],
+        functools.partial(post_scopes, post_id)
+    )
+    if scopes:
+        version = f'{version}.{feed_version(*scopes)}'
+    return version
+
+
+def post_scopes(post_id):
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    return [f'author:{username}'] if username else []
+
+
+def hidden_user_fields(prefix=''):
+    """Невыводимые поля пользователя для defer() с префиксом связи."""
+    return [
+        f'{prefix}{field.name}' for field in User._meta.concrete_fields
+        if not field.primary_key and field.name not in DISPLAYED_USER_FIELDS
+    ]
+
+
+def author_scope(author_id):
+    username = User.objects.filter(pk=author_id).values_list(
+        'username', flat=True
+    ).first()
+    return {f'author:{username}'} if username else set()
+
+
+def list_scopes(author_ids, group_ids):
+    """Области лент, в которые входят посты авторов и групп."""
+    scopes = {'posts'}
+    usernames = User.objects.filter(pk__in=author_ids).values_list(
+        'username', flat=True
+    )
+    scopes.update(f'author:{username}' for username in usernames)
+    group_ids = set(group_ids) - {None}
+    if group_ids:
+        slugs = Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True
+        )
+        scopes.update(f'group:{slug}' for slug in slugs)
+    return scopes
+
+
+def bump_post(post, old_group_id=None):
+    bump(f'post:{post.pk}', *list_scopes(
+        {post.author_id}, {post.group_id, old_group_id}
+    ))
+
+
+def bump_author(*author_ids):
+    scopes = set()
+    for author_id in author_ids:
+        scopes |= author_scope(author_id)
+    bump(*scopes)
+
+
+def make_key(prefix, version, *parts):
+    """Ключ кеша с версией; произвольные части хешируются."""
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'{prefix}:{version}:{digest}'
+
+
+def get_or_set(prefix, version, parts, default):
+    """
+    Значение из кеша для версии ленты или результат default().
+    Исключения default() (например, Http404) не кешируются.
+    """
+    key = make_key(prefix, version, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = default()
+        cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+    return value
+
+
+def post_keys(post):
+    """
+    Суррогатные ключи страниц, на которых выводится пост.
+
+    Ключи строятся по идентификаторам, чтобы очистка не требовала
+    запросов к базе: 'post-<id>', 'author-<id>', 'group-<id>'.
+    Состав списков постов помечают отдельные ключи: 'feed' для главной,
+    'group-<id>-list' и 'author-<id>-list' (list_keys()).
+    """
+    keys = {f'post-{post.pk}', f'author-{post.author_id}'}
+    if post.group_id:
+        keys.add(f'group-{post.group_id}')
+    return keys
+
+
+def list_keys(post):
+    """Ключи списков, в которые входит пост."""
+    keys = {'feed', f'author-{post.author_id}-list'}
+    if post.group_id:
+        keys.add(f'group-{post.group_id}-list')
+    return keys
+
+
+def page_keys(page_obj, *keys):
+    """Ключи страницы ленты: собственные keys и ключи всех её постов."""
+    result = set(keys)
+    for post in page_obj:
+        result |= post_keys(post)
+    return result
+
+
+def conditional(version):
+    """
+    Условный GET для страницы, содержимое которой определяется версией
+    version(*args, **kwargs) из аргументов представления.
+
+    ETag строится из версии, адреса с параметрами и пользователя,
+    Last-Modified — из самой поздней метки версии (это time_ns момента
+    изменения). Версии лежат в кеше, поэтому ответ 304 не требует
+    запросов к базе, кроме загрузки сессии вошедшего пользователя.
+    """
+    def current(request, *args, **kwargs):
+        # ETag и Last-Modified строятся из одной версии за запрос.
+        if not hasattr(request, '_feed_version'):
+            request._feed_version = version(*args, **kwargs)
+        return request._feed_version
+
+    def etag(request, *args, **kwargs):
+        return hashlib.md5(':'.join((
+            current(request, *args, **kwargs),
+            request.get_full_path(),
+            str(request.user.pk or 0),
+        )).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        latest = max(map(int, current(request, *args, **kwargs).split('.')))
+        return datetime.fromtimestamp(latest / 10 ** 9, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,92 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _counted(queryset, field):
+    """Подзапрос числа строк queryset для каждого OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def user_counts():
+    """Выражения для пересчёта счётчиков UserStats по User."""
+    return {
+        'posts_count': _counted(Post.objects.all(), 'author'),
+        'followers_count': _counted(Follow.objects.all(), 'author'),
+        'following_count': _counted(Follow.objects.all(), 'user'),
+    }
+
+
+def post_counts():
+    """Выражения для пересчёта счётчиков Post."""
+    return {'comments_count': _counted(Comment.objects.all(), 'post')}
+
+
+def _shift(queryset, deltas):
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def change_user(user_id, **deltas):
+    """
+    Сдвигает счётчики пользователя.
+
+    Недостающая строка создаётся только при увеличении счётчиков:
+    при каскадном удалении пользователя её нельзя создавать заново.
+    """
+    shifted = _shift(UserStats.objects.filter(user_id=user_id), deltas)
+    if not shifted and any(delta > 0 for delta in deltas.values()):
+        create_user_stats(user_id)
+
+
+def change_post(post_id, **deltas):
+    _shift(Post.objects.filter(pk=post_id), deltas)
+
+
+def create_user_stats(user_id):
+    """Создаёт строку счётчиков по фактическим данным."""
+    counts = User.objects.filter(pk=user_id).values(**user_counts()).first()
+    if counts is not None:
+        UserStats.objects.get_or_create(user_id=user_id, defaults=counts)
+
+
+def _reconcile(queryset, expressions):
+    """Пересчитывает счётчики одним UPDATE, возвращает число расхождений."""
+    drift = Q()
+    for field in expressions:
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+    drifted = queryset.annotate(**{
+        f'actual_{field}': expression
+        for field, expression in expressions.items()
+    }).filter(drift).count()
+    if drifted:
+        queryset.update(**expressions)
+    return drifted
+
+
+def reconcile_users():
+    """Создаёт недостающие строки UserStats и исправляет расхождения."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        ignore_conflicts=True
+    )
+    return _reconcile(UserStats.objects.all(), user_counts())
+
+
+def reconcile_posts():
+    return _reconcile(Post.objects.all(), post_counts())
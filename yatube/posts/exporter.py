@@ -0,0 +1,177 @@
+"""
+Потоковая выгрузка постов и комментариев в JSONL или CSV.
+
+Записи читаются из базы порциями (QuerySet.iterator(chunk_size)) и сразу
+отдаются клиенту через StreamingHttpResponse, поэтому расход памяти
+не зависит от размера выгрузки. Поля записей совпадают с полями
+команды import_data; поле type отличает посты от комментариев, и файл
+загружается обратно командами import_data posts и import_data comments.
+В режиме zip данные и картинки постов упаковываются в архив на лету.
+"""
+import csv
+import json
+import zipfile
+from itertools import chain
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .models import Comment, Post
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+COLUMNS = (
+    'type', 'id', 'post', 'author', 'group', 'text', 'pub_date', 'created',
+    'image',
+)
+# Сколько байт копить перед отправкой очередного куска ответа.
+BUFFER_SIZE = 64 * 1024
+
+
+def post_records(posts):
+    posts = posts.select_related('author', 'group').order_by('id')
+    for post in posts.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'post',
+            'id': post.pk,
+            'author': post.author.username,
+            'group': post.group.slug if post.group else None,
+            'text': post.text,
+            'pub_date': post.pub_date.isoformat(),
+            'image': post.image.name or None,
+        }
+
+
+def comment_records(comments):
+    comments = comments.filter(post__isnull=False).select_related(
+        'author'
+    ).order_by('id')
+    for comment in comments.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'comment',
+            'id': comment.pk,
+            'post': comment.post_id,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        }
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Псевдофайл для csv.writer: write() возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(Echo(), COLUMNS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+LINES = {'jsonl': jsonl_lines, 'csv': csv_lines}
+
+
+def buffered(lines):
+    """Склеивает строки в куски по BUFFER_SIZE байт."""
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+class ZipStream:
+    """
+    Буфер, в который пишет zipfile. Без seek() zipfile пишет архив
+    последовательно, и готовые байты можно отдавать по мере записи.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def zip_chunks(data_name, lines, image_names):
+    """Архив с файлом данных и картинками из image_names."""
+    stream = ZipStream()
+    storage = Post._meta.get_field('image').storage
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(data_name, 'w', force_zip64=True) as entry:
+            for chunk in buffered(lines):
+                entry.write(chunk)
+                yield stream.pop()
+        for name in image_names:
+            if not storage.exists(name):
+                continue
+            # Картинки уже сжаты, поэтому хранятся без сжатия.
+            info = zipfile.ZipInfo(f'images/{name}')
+            info.compress_type = zipfile.ZIP_STORED
+            with storage.open(name) as source, \
+                    archive.open(info, 'w') as entry:
+                for block in iter(lambda: source.read(BUFFER_SIZE), b''):
+                    entry.write(block)
+                    yield stream.pop()
+    yield stream.pop()
+
+
+def export_response(filename, posts=None, comments=None, format='jsonl',
+                    images=False):
+    """
+    StreamingHttpResponse с постами posts и комментариями comments.
+    С images=True — zip-архив с данными и картинками постов.
+    """
+    posts = Post.objects.none() if posts is None else posts
+    comments = Comment.objects.none() if comments is None else comments
+    lines = LINES[format](
+        chain(post_records(posts), comment_records(comments))
+    )
+    if images:
+        image_names = posts.exclude(image='').order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        response = StreamingHttpResponse(
+            zip_chunks(
+                f'{filename}.{format}', lines,
+                image_names.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+            ),
+            content_type='application/zip'
+        )
+        filename = f'{filename}.zip'
+    else:
+        response = StreamingHttpResponse(
+            buffered(lines), content_type=CONTENT_TYPES[format]
+        )
+        filename = f'{filename}.{format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
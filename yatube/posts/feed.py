@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.tasks import task
+
+from .models import FeedItem, Follow, Post, UserStats
+
+
+def feed_sources(user):
+    """
+    Источники ленты подписок с общим ключом (feed_pub_date, feed_post_id).
+
+    Посты авторов в режиме push читаются из разложенных записей FeedItem,
+    посты авторов в режиме pull — напрямую из Post.
+    """
+    posts = Post.objects.select_related('author', 'group')
+    pushed = posts.filter(feed_items__user=user).annotate(
+        feed_pub_date=F('feed_items__pub_date'),
+        feed_post_id=F('feed_items__post_id'),
+    )
+    pulled = posts.filter(
+        author_id__in=Follow.objects.filter(
+            user=user,
+            pushed=False
+        ).values('author_id')
+    ).annotate(
+        feed_pub_date=F('pub_date'),
+        feed_post_id=F('id'),
+    )
+    return [pushed, pulled]
+
+
+def fanout_enabled(author_id, lock=False):
+    """
+    Раскладывать ли посты автора по лентам подписчиков. С lock=True
+    строка счётчиков автора блокируется до конца транзакции.
+    """
+    stats = UserStats.objects.filter(user_id=author_id)
+    if lock:
+        stats = stats.select_for_update()
+    followers = stats.values_list('followers_count', flat=True).first()
+    return (followers or 0) <= settings.FEED_FANOUT_LIMIT
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        ),
+        ignore_conflicts=True
+    )
+
+
+@task
+@transaction.atomic
+def sync_author(author_id, backfill_all=False):
+    """
+    Переводит подписки на автора в режим push или pull
+    по текущему числу подписчиков. Возвращает True для push.
+
+    Выполняется в очереди задач после подписок и отписок. Строка
+    счётчиков автора блокируется: публикация поста обновляет её
+    в своей транзакции, поэтому пост не потеряется между заполнением
+    ленты и переключением подписки в push.
+    """
+    follows = Follow.objects.filter(author_id=author_id)
+    if not fanout_enabled(author_id, lock=True):
+        follows.filter(pushed=True).update(pushed=False)
+        return False
+    if not backfill_all:
+        follows = follows.filter(pushed=False)
+    for user_id in follows.values_list('user_id', flat=True):
+        backfill(user_id, author_id)
+    follows.filter(pushed=False).update(pushed=True)
+    return True
+
+
+def push_post(post):
+    """
+    Раскладывает новый пост по лентам подписчиков в режиме push.
+    Режим подписок меняет задача sync_author, а не публикация.
+    """
+    followers = Follow.objects.filter(
+        author_id=post.author_id, pushed=True
+    ).values_list('user_id', flat=True)
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True
+    )
+
+
+def update_post(post):
+    """Синхронизирует ключ сортировки ленты после правки поста."""
+    FeedItem.objects.filter(post=post).exclude(
+        pub_date=post.pub_date
+    ).update(pub_date=post.pub_date)
+
+
+def follow(user_id, author_id):
+    """
+    Подключает автора к ленте нового подписчика. Пока задача
+    sync_author не заполнила ленту, посты автора читаются напрямую.
+    """
+    Follow.objects.filter(
+        user_id=user_id,
+        author_id=author_id
+    ).update(pushed=False)
+    sync_author.delay(author_id)
+
+
+def unfollow(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    FeedItem.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+    sync_author.delay(author_id)
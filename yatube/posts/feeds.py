@@ -0,0 +1,205 @@
+"""
+RSS и Atom ленты: все посты, посты группы и посты автора.
+
+Ленты кешируются так же, как страницы (posts.cache, core.page_cache):
+выводимые поля постов и объект группы или автора лежат в кеше под
+версией ленты, ответ анонимам — в полностраничном кеше с суррогатными
+ключами, а условный GET по версии отвечает 304 после одного обращения к кешу.
+"""
+from collections import namedtuple
+from functools import partial
+
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from core import page_cache
+
+from . import cache
+from .models import Group, Post, User
+
+FEED_LIMIT = 20
+# Поля поста, которые выводит лента, вместе с ключами для post_keys().
+Item = namedtuple('Item', (
+    'pk', 'author_id', 'group_id', 'text', 'pub_date', 'updated_at',
+    'username', 'author_name', 'group_title',
+))
+
+
+def feed_items(posts):
+    """Первые FEED_LIMIT постов как Item без лишних полей автора."""
+    rows = posts.values_list(
+        'pk', 'author_id', 'group_id', 'text', 'pub_date', 'updated_at',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__title',
+    )[:FEED_LIMIT]
+    return [
+        Item(*row, f'{first} {last}'.strip() or row[-1], group_title)
+        for *row, first, last, group_title in rows
+    ]
+
+
+class PostsFeed(Feed):
+    """Последние посты сайта."""
+    title = 'Yatube: последние обновления'
+    description = 'Новые записи всех авторов Yatube'
+
+    def version(self, obj):
+        return cache.index_version()
+
+    def scope(self, obj):
+        return 'index'
+
+    def keys(self, obj):
+        return ('feed',)
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def __call__(self, request, *args, **kwargs):
+        response = super().__call__(request, *args, **kwargs)
+        # Last-Modified задаёт условный GET по версии ленты.
+        del response['Last-Modified']
+        obj = self.get_object(request, *args, **kwargs)
+        return page_cache.add_keys(
+            response, cache.page_keys(self.items(obj), *self.keys(obj))
+        )
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def items(self, obj):
+        return cache.get_or_set(
+            'syndication', self.version(obj), [self.scope(obj)],
+            partial(feed_items, self.posts(obj))
+        )
+
+    def item_title(self, post):
+        return Truncator(post.text).words(8)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.updated_at
+
+    def item_author_name(self, post):
+        return post.author_name
+
+    def item_author_link(self, post):
+        return reverse('posts:profile', kwargs={'username': post.username})
+
+    def item_categories(self, post):
+        return (post.group_title,) if post.group_title else ()
+
+
+class GroupFeed(PostsFeed):
+    """Последние посты группы."""
+
+    def get_object(self, request, slug):
+        return cache.get_or_set(
+            'group', cache.group_version(slug), [slug],
+            partial(get_object_or_404, Group, slug=slug)
+        )
+
+    def version(self, group):
+        return cache.group_version(group.slug)
+
+    def scope(self, group):
+        return f'group:{group.slug}'
+
+    def keys(self, group):
+        return (f'group-{group.pk}', f'group-{group.pk}-list')
+
+    def posts(self, group):
+        return group.posts.all()
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts', kwargs={'slug': group.slug})
+
+
+class AuthorFeed(PostsFeed):
+    """Последние посты автора."""
+
+    def get_object(self, request, username):
+        return cache.get_or_set(
+            'author', cache.author_version(username), [username],
+            partial(
+                get_object_or_404,
+                User.objects.select_related('stats').defer(
+                    *cache.hidden_user_fields()
+                ),
+                username=username
+            )
+        )
+
+    def version(self, author):
+        return cache.author_version(author.username)
+
+    def scope(self, author):
+        return f'author:{author.username}'
+
+    def keys(self, author):
+        return (f'author-{author.pk}', f'author-{author.pk}-list')
+
+    def posts(self, author):
+        return author.posts.all()
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse(
+            'posts:profile', kwargs={'username': author.username}
+        )
+
+
+class AtomFeedMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomFeedMixin, PostsFeed):
+    pass
+
+
+class GroupAtomFeed(AtomFeedMixin, GroupFeed):
+    pass
+
+
+class AuthorAtomFeed(AtomFeedMixin, AuthorFeed):
+    pass
+
+
+def feed_view(feed_class, version):
+    """Представление ленты с условным GET и полностраничным кешем."""
+    return cache.conditional(version)(
+        page_cache.cache_anonymous(feed_class())
+    )
+
+
+index_rss = feed_view(PostsFeed, cache.index_version)
+index_atom = feed_view(PostsAtomFeed, cache.index_version)
+group_rss = feed_view(GroupFeed, cache.group_version)
+group_atom = feed_view(GroupAtomFeed, cache.group_version)
+author_rss = feed_view(AuthorFeed, cache.author_version)
+author_atom = feed_view(AuthorAtomFeed, cache.author_version)
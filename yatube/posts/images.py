@@ -0,0 +1,186 @@
+import hashlib
+import io
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, ImageSequence
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import content_storage
+from core.tasks import task
+
+from .models import Post
+
+# Форматы, которые сохраняются как есть; остальные перекодируются
+# в JPEG или, при наличии прозрачности, в PNG.
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+# Форматы, анимация в которых сохраняется; у остальных многокадровых
+# (MPO, TIFF) остаётся первый кадр.
+ANIMATED_FORMATS = ('GIF', 'PNG', 'WEBP')
+# Поля Post, которые заполняет describe().
+FIELDS = ('image_width', 'image_height', 'image_placeholder', 'image_hash')
+# Метаданные, которые не должны попасть в сохранённый файл.
+STRIPPED_INFO = ('exif', 'XML:com.adobe.xmp', 'comment')
+
+
+def save_options(image_format):
+    quality = settings.POST_IMAGE_QUALITY
+    return {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'WEBP': {'quality': quality, 'method': 4},
+        'PNG': {'optimize': True},
+        'GIF': {'optimize': True},
+    }[image_format]
+
+
+def fit_size(size, limit):
+    ratio = min(limit / size[0], limit / size[1], 1)
+    return max(round(size[0] * ratio), 1), max(round(size[1] * ratio), 1)
+
+
+def normalize(upload):
+    """
+    Приводит загруженное изображение к ограниченному виду.
+
+    Размеры и число пикселей проверяются по заголовку до декодирования,
+    поэтому «бомба» с огромным холстом отклоняется без выделения памяти.
+    JPEG декодируется сразу в уменьшенном масштабе (draft), ориентация
+    из EXIF применяется к пикселям, после чего EXIF и прочие метаданные
+    отбрасываются, а изображение перекодируется с POST_IMAGE_QUALITY.
+    В анимации уменьшается и перекодируется каждый кадр; анимации,
+    у которых сумма пикселей всех кадров больше
+    POST_IMAGE_MAX_ANIMATION_PIXELS, отклоняются.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл изображения слишком большой.', code='file_size'
+        )
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (Image.DecompressionBombError, OSError):
+        raise ValidationError(
+            'Не удалось прочитать изображение.', code='invalid_image'
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое разрешение изображения: %(width)s×%(height)s.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height}
+        )
+    source_format = image.format
+    limit = settings.POST_IMAGE_MAX_SIDE
+    frames = getattr(image, 'n_frames', 1)
+    if frames > 1 and source_format in ANIMATED_FORMATS:
+        if frames * width * height > settings.POST_IMAGE_MAX_ANIMATION_PIXELS:
+            raise ValidationError(
+                'Слишком длинная анимация: %(frames)s кадров.',
+                code='too_many_frames',
+                params={'frames': frames}
+            )
+        return normalize_animation(upload.name, image, limit)
+    image.draft(image.mode, fit_size(image.size, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    for key in STRIPPED_INFO:
+        image.info.pop(key, None)
+
+    name = upload.name
+    image_format = source_format
+    if image_format not in EXTENSIONS:
+        transparent = 'A' in image.getbands() or 'transparency' in image.info
+        image_format = 'PNG' if transparent else 'JPEG'
+        name = f'{os.path.splitext(name)[0]}.{EXTENSIONS[image_format]}'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **save_options(image_format))
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type=Image.MIME[image_format]
+    )
+
+
+def normalize_animation(name, image, limit):
+    """Уменьшает каждый кадр анимации, сохраняя длительности и повторы."""
+    image_format = image.format
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frame = frame.convert('RGBA')
+        frame.thumbnail((limit, limit), Image.LANCZOS)
+        for key in STRIPPED_INFO:
+            frame.info.pop(key, None)
+        frames.append(frame)
+    buffer = io.BytesIO()
+    frames[0].save(
+        buffer, image_format, save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0),
+        **save_options(image_format)
+    )
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type=Image.MIME[image_format]
+    )
+
+
+def describe(file):
+    """
+    Метаданные изображения для хранения в строке Post: размеры,
+    преобладающий цвет и SHA-256 содержимого. Файл читается один раз
+    по частям, позиция в нём после вызова возвращается в начало.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    image = Image.open(file)
+    width, height = image.size
+    image.draft('RGB', (64, 64))
+    image.thumbnail((64, 64))
+    pixel = image.convert('RGB').resize((1, 1), Image.BOX).getpixel((0, 0))
+    file.seek(0)
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_placeholder': '#{:02x}{:02x}{:02x}'.format(*pixel),
+        'image_hash': digest.hexdigest(),
+    }
+
+
+def clear_description():
+    return {
+        'image_width': None,
+        'image_height': None,
+        'image_placeholder': '',
+        'image_hash': '',
+    }
+
+
+@task
+def release(name):
+    """
+    Удаляет файл картинки и его миниатюры, когда на него больше
+    не ссылается ни один пост. Одинаковые загрузки хранятся одним
+    файлом, поэтому удаление поста само по себе файл не удаляет.
+
+    Файл, который загружали позже POST_IMAGE_RELEASE_GRACE секунд назад,
+    может принадлежать ещё не зафиксированному посту: удаление
+    переносится на потом. Проверка и удаление идут под блокировкой
+    хранилища, поэтому параллельная загрузка того же содержимого
+    либо продлит жизнь файла, либо запишет его заново.
+    """
+    with content_storage.lock(name):
+        if Post.objects.filter(image=name).exists():
+            return
+        if content_storage.exists(name):
+            age = time.time() - os.path.getmtime(content_storage.path(name))
+            grace = settings.POST_IMAGE_RELEASE_GRACE
+            if age < grace:
+                release.delay(name, delay=grace - age)
+                return
+        default.kvstore.delete(ImageFile(name, content_storage))
+        content_storage.delete(name)
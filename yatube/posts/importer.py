@@ -0,0 +1,424 @@
+"""
+Массовый импорт постов, комментариев и подписок (команда import_data).
+
+Строки читаются потоком из JSONL или CSV и пишутся через bulk_create
+пачками; каждая порция строк импортируется в своей транзакции. Сигналы
+при bulk_create не срабатывают, поэтому поисковый индекс, кеши, счётчики
+и ленты подписок обновляются здесь же: по порциям и в конце импорта.
+
+Посты и комментарии сохраняются с id из входных данных, подписки
+уникальны по паре (user, author), а уже существующие строки пропускаются.
+Поэтому повторный импорт тех же данных ничего не меняет.
+Строки с полем type (общая выгрузка posts.exporter) импортируются только
+своим видом: файл выгрузки загружается командами posts и comments.
+"""
+import csv
+import json
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import page_cache
+
+from . import cache, counters, feed, search
+from .models import Comment, Follow, Group, Post, User
+from .utils import chunked
+
+FORMATS = ('jsonl', 'csv')
+USERNAME = User._meta.get_field('username')
+# Сколько авторов пересобирать в ленты подписчиков за одну транзакцию.
+FEED_SYNC_BATCH = 100
+
+
+class InvalidRow(ValueError):
+    """Строку нельзя импортировать; она пропускается."""
+
+
+def read_rows(file, format):
+    """Словари строк входного файла; None вместо нечитаемой строки."""
+    if format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def _required(row, name):
+    value = row.get(name)
+    if value in (None, ''):
+        raise InvalidRow(f'нет поля {name}')
+    return value
+
+
+def _int(row, name):
+    try:
+        return int(_required(row, name))
+    except (TypeError, ValueError):
+        raise InvalidRow(f'{name} — не целое число')
+
+
+def _datetime(row, name):
+    value = row.get(name)
+    if not value:
+        return timezone.now()
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise InvalidRow(f'{name} — не дата и время ISO 8601')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class IdMap:
+    """
+    id пользователей по username и групп по slug, загруженные один раз.
+
+    Недостающие пользователи создаются пачкой без пароля только для
+    строк, прошедших проверку; группы должны существовать заранее.
+    """
+
+    def __init__(self):
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+
+    def add_users(self, usernames):
+        missing = {name for name in usernames if name not in self.users}
+        if not missing:
+            return
+        password = make_password(None)
+        User.objects.bulk_create(
+            (User(username=name, password=password) for name in missing),
+            ignore_conflicts=True
+        )
+        self.users.update(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'id'
+            )
+        )
+
+    def username(self, row, name):
+        """Имя пользователя из поля name, проверенное как при регистрации."""
+        username = str(_required(row, name))
+        if username in self.users:
+            return username
+        try:
+            USERNAME.run_validators(username)
+        except ValidationError:
+            raise InvalidRow(f'{name} — недопустимое имя пользователя')
+        return username
+
+    def group(self, row):
+        slug = row.get('group')
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise InvalidRow(f'нет группы {slug}')
+        return self.groups[slug]
+
+
+class Kind(ABC):
+    """Вид импортируемых строк: модель и построение объекта из строки."""
+    model = None
+    # Значение поля type в строках выгрузки (posts.exporter).
+    type = None
+    # Поля строки с username и атрибуты объекта, получающие их id.
+    user_fields = {'author': 'author_id'}
+    date_fields = ()
+
+    def accepts(self, row):
+        """Строки без поля type или с type этого вида."""
+        return row.get('type') in (None, '', self.type)
+
+    def usernames(self, row, ids):
+        """{атрибут объекта: username} из полей user_fields строки."""
+        return {
+            attribute: ids.username(row, name)
+            for name, attribute in self.user_fields.items()
+        }
+
+    @abstractmethod
+    def build(self, row, ids):
+        """Объект модели без id пользователей; InvalidRow для плохой строки."""
+
+    def key(self, obj):
+        return obj.pk
+
+    def existing(self, objects):
+        """Ключи объектов порции, которые уже есть в базе."""
+        return set(self.model.objects.filter(
+            pk__in=[obj.pk for obj in objects]
+        ).values_list('pk', flat=True))
+
+    def check(self, objects):
+        """Проверки, которым нужна база: {номер объекта: текст ошибки}."""
+        return {}
+
+    def after_chunk(self, objects):
+        """Индексы и кеши после записи порции."""
+
+    def authors(self, objects):
+        """Авторы, ленты подписчиков которых нужно пересобрать."""
+        return {obj.author_id for obj in objects}
+
+    def finish(self):
+        reset_sequences(self.model)
+        counters.reconcile_users()
+
+
+class PostKind(Kind):
+    model = Post
+    type = 'post'
+    date_fields = ('pub_date', 'updated_at')
+
+    def build(self, row, ids):
+        pub_date = _datetime(row, 'pub_date')
+        return Post(
+            id=_int(row, 'id'),
+            group_id=ids.group(row),
+            text=_required(row, 'text'),
+            image=row.get('image') or '',
+            pub_date=pub_date,
+            updated_at=pub_date,
+        )
+
+    def after_chunk(self, posts):
+        search.index_posts(posts)
+        keys = {'feed'}
+        for post in posts:
+            keys |= cache.list_keys(post)
+        cache.bump(*cache.list_scopes(
+            {post.author_id for post in posts},
+            {post.group_id for post in posts}
+        ))
+        page_cache.purge(*keys)
+
+
+class CommentKind(Kind):
+    model = Comment
+    type = 'comment'
+    date_fields = ('created',)
+
+    def build(self, row, ids):
+        return Comment(
+            id=_int(row, 'id'),
+            post_id=_int(row, 'post'),
+            text=_required(row, 'text'),
+            created=_datetime(row, 'created'),
+        )
+
+    def check(self, comments):
+        posts = set(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', flat=True))
+        return {
+            number: f'нет поста {comment.post_id}'
+            for number, comment in enumerate(comments)
+            if comment.post_id not in posts
+        }
+
+    def after_chunk(self, comments):
+        search.index_comments(comments)
+        post_ids = {comment.post_id for comment in comments}
+        cache.bump('comments', *(f'post:{post_id}' for post_id in post_ids))
+        page_cache.purge(*(f'comments-{post_id}' for post_id in post_ids))
+
+    def authors(self, comments):
+        return set()
+
+    def finish(self):
+        super().finish()
+        counters.reconcile_posts()
+
+
+class FollowKind(Kind):
+    model = Follow
+    type = 'follow'
+    user_fields = {'user': 'user_id', 'author': 'author_id'}
+
+    def usernames(self, row, ids):
+        usernames = super().usernames(row, ids)
+        if usernames['user_id'] == usernames['author_id']:
+            raise InvalidRow('подписка на самого себя')
+        return usernames
+
+    def build(self, row, ids):
+        return Follow()
+
+    def key(self, follow):
+        return follow.user_id, follow.author_id
+
+    def existing(self, follows):
+        return set(Follow.objects.filter(
+            user_id__in={follow.user_id for follow in follows}
+        ).values_list('user_id', 'author_id'))
+
+    def after_chunk(self, follows):
+        author_ids = set()
+        for follow in follows:
+            author_ids |= {follow.user_id, follow.author_id}
+        cache.bump_author(*author_ids)
+        page_cache.purge(*(f'author-{pk}' for pk in author_ids))
+
+    def finish(self):
+        counters.reconcile_users()
+
+
+KINDS = {
+    'posts': PostKind,
+    'comments': CommentKind,
+    'follows': FollowKind,
+}
+
+
+@contextmanager
+def keep_dates(model, names):
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из файла."""
+    fields = [model._meta.get_field(name) for name in names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def deferred_indexes(model, enabled=True):
+    """
+    Удаляет индексы из Meta.indexes модели на время импорта
+    и строит их заново в конце. Индексы внешних ключей
+    и ограничения уникальности остаются на месте.
+    """
+    indexes = list(model._meta.indexes) if enabled else []
+    if not indexes:
+        yield
+        return
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(model, index)
+
+
+def reset_sequences(model):
+    """Сдвигает счётчик id после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Importer:
+    """
+    Импорт строк одного вида. progress(report) вызывается после каждой
+    порции, errors(line, message) — для каждой пропущенной строки.
+    """
+
+    def __init__(self, kind, batch_size=1000, chunk_size=10000,
+                 progress=None, errors=None):
+        self.kind = KINDS[kind]()
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.progress = progress or (lambda report: None)
+        self.errors = errors or (lambda line, message: None)
+        self.report = {'rows': 0, 'imported': 0, 'invalid': 0, 'other': 0}
+        self.authors = set()
+
+    def run(self, rows, defer_indexes=False):
+        model = self.kind.model
+        ids = IdMap()
+        numbered = enumerate(rows, start=1)
+        with deferred_indexes(model, defer_indexes), \
+                keep_dates(model, self.kind.date_fields):
+            for chunk in chunked(numbered, self.chunk_size):
+                self.import_chunk(chunk, ids)
+                self.progress(self.report)
+        self.finish()
+        return self.report
+
+    def parse(self, chunk, ids):
+        """(номер строки, объект, usernames) для разобранных строк порции."""
+        kind = self.kind
+        pending = []
+        for line, row in chunk:
+            if row is None:
+                self.skip(line, 'строка не разбирается как объект JSON')
+                continue
+            if not kind.accepts(row):
+                self.report['other'] += 1
+                continue
+            try:
+                usernames = kind.usernames(row, ids)
+                obj = kind.build(row, ids)
+            except InvalidRow as error:
+                self.skip(line, str(error))
+                continue
+            pending.append((line, obj, usernames))
+        return pending
+
+    @transaction.atomic
+    def import_chunk(self, chunk, ids):
+        kind = self.kind
+        pending = self.parse(chunk, ids)
+        invalid = kind.check([obj for _, obj, _ in pending])
+        valid = []
+        for number, (line, obj, usernames) in enumerate(pending):
+            if number in invalid:
+                self.skip(line, invalid[number])
+            else:
+                valid.append((obj, usernames))
+        ids.add_users(
+            name for _, usernames in valid for name in usernames.values()
+        )
+        built = {}
+        for obj, usernames in valid:
+            for attribute, name in usernames.items():
+                setattr(obj, attribute, ids.users[name])
+            built.setdefault(kind.key(obj), obj)
+        existing = kind.existing(list(built.values()))
+        fresh = [obj for key, obj in built.items() if key not in existing]
+        kind.model.objects.bulk_create(
+            fresh, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        if fresh:
+            kind.after_chunk(fresh)
+            self.authors |= kind.authors(fresh)
+        self.report['rows'] += len(chunk)
+        self.report['imported'] += len(fresh)
+
+    def skip(self, line, message):
+        self.report['invalid'] += 1
+        self.errors(line, message)
+
+    def finish(self):
+        """
+        Счётчики, ленты подписок и счётчик id после импорта.
+        Ленты пересобираются пачками авторов, каждая в своей транзакции.
+        """
+        with transaction.atomic():
+            self.kind.finish()
+        for author_ids in chunked(sorted(self.authors), FEED_SYNC_BATCH):
+            with transaction.atomic():
+                for author_id in author_ids:
+                    feed.sync_author(author_id, backfill_all=True)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по существующим подпискам.'
+
+    def handle(self, *args, **options):
+        authors = Follow.objects.values_list(
+            'author_id', flat=True
+        ).distinct().order_by('author_id')
+        pushed = pulled = 0
+        for author_id in authors.iterator():
+            if feed.sync_author(author_id, backfill_all=True):
+                pushed += 1
+            else:
+                pulled += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов в режиме push: {pushed}, в режиме pull: {pulled}'
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.images import FIELDS, describe
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, цвет-заглушку и хеш картинок существующих '
+        'постов. Посты обрабатываются пачками по возрастанию id; '
+        'уже заполненные пропускаются, поэтому команду можно прерывать '
+        'и запускать повторно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        pending = Post.objects.exclude(image='').filter(
+            image_hash=''
+        ).only('id', 'image').order_by('id')
+        last_id = 0
+        updated = missing = 0
+        while True:
+            batch = list(
+                pending.filter(id__gt=last_id)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            described = []
+            for post in batch:
+                try:
+                    with post.image.open('rb') as image:
+                        description = describe(image)
+                except (OSError, ValueError):
+                    missing += 1
+                    self.stderr.write(
+                        f'Пост {post.id}: не удалось прочитать {post.image}'
+                    )
+                    continue
+                for field, value in description.items():
+                    setattr(post, field, value)
+                described.append(post)
+            with transaction.atomic():
+                Post.objects.bulk_update(described, FIELDS)
+            updated += len(described)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {updated}, файлов не найдено: {missing}'
+        ))
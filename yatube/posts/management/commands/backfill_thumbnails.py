@@ -0,0 +1,101 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def build(post_id, name, image_width):
+    """Строит миниатюры одного поста; возвращает (id, текст ошибки)."""
+    try:
+        thumbnails.generate(name, image_width)
+    except Exception as error:
+        return post_id, f'{type(error).__name__}: {error}'
+    return post_id, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит миниатюры всех размеров для картинок существующих постов '
+        'в нескольких процессах. Посты обрабатываются пачками по '
+        'возрастанию id; после каждой пачки в файл контрольной точки '
+        'записывается последний id, и повторный запуск продолжает с него. '
+        'Контрольная точка сбрасывается, если изменился набор размеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Число процессов; 0 — в текущем процессе.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--checkpoint',
+                            default='backfill_thumbnails.json')
+        parser.add_argument('--reset', action='store_true',
+                            help='Начать заново, игнорируя контрольную точку.')
+
+    def load_checkpoint(self, path, signature, reset):
+        if reset or not os.path.exists(path):
+            return 0
+        with open(path) as file:
+            checkpoint = json.load(file)
+        if checkpoint.get('sizes') != signature:
+            self.stdout.write('Набор размеров изменился, начинаем заново')
+            return 0
+        return checkpoint['last_id']
+
+    def save_checkpoint(self, path, signature, last_id):
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump({'sizes': signature, 'last_id': last_id}, file)
+        os.replace(f'{path}.tmp', path)
+
+    def handle(self, *args, **options):
+        signature = repr(thumbnails.sizes())
+        last_id = self.load_checkpoint(
+            options['checkpoint'], signature, options['reset']
+        )
+        pending = Post.objects.exclude(image='').order_by('id').values_list(
+            'id', 'image', 'image_width'
+        )
+        executor = options['workers'] and ProcessPoolExecutor(
+            options['workers'],
+            mp_context=get_context('spawn'),
+            initializer=django.setup
+        )
+        done = failed = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                batch = list(
+                    pending.filter(id__gt=last_id)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                if executor:
+                    results = executor.map(build, *zip(*batch))
+                else:
+                    results = (build(*row) for row in batch)
+                for post_id, error in results:
+                    if error:
+                        failed += 1
+                        self.stderr.write(f'Пост {post_id}: {error}')
+                done += len(batch)
+                last_id = batch[-1][0]
+                self.save_checkpoint(options['checkpoint'], signature, last_id)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'id ≤ {last_id}: {done} картинок, '
+                    f'{done / elapsed:.1f} картинок/с'
+                )
+        finally:
+            if executor:
+                executor.shutdown()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done} картинок, ошибок: {failed}, '
+            f'{done / elapsed if elapsed else 0:.1f} картинок/с'
+        ))
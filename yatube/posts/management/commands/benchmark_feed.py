@@ -0,0 +1,118 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core.paginator import MergedCursorPaginator
+from posts import counters, feed
+from posts.models import FeedItem, Follow, Post, User
+from posts.utils import POST_LIMIT
+
+
+class Rollback(Exception):
+    """Откатывает синтетические данные после замера."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает усиление записи и задержку чтения ленты подписок '
+        'при разных порогах FEED_FANOUT_LIMIT и распределениях подписчиков. '
+        'Все данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=5,
+                            help='Постов на автора.')
+        parser.add_argument('--reads', type=int, default=50,
+                            help='Сколько лент прочитать.')
+        parser.add_argument('--limits', type=int, nargs='+',
+                            default=[0, 100, 10 ** 9])
+        parser.add_argument('--distributions', nargs='+',
+                            default=['uniform', 'zipf'],
+                            choices=['uniform', 'zipf'])
+
+    def followers_per_author(self, distribution, users, authors):
+        if distribution == 'uniform':
+            return [users // 10] * authors
+        return [max(1, users // rank) for rank in range(1, authors + 1)]
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'distribution  limit       write_amp  ms/post  '
+            'read_p50_ms  read_p95_ms  queries/read'
+        )
+        for distribution in options['distributions']:
+            for limit in options['limits']:
+                try:
+                    with transaction.atomic():
+                        row = self.run(distribution, limit, options)
+                        raise Rollback
+                except Rollback:
+                    pass
+                self.stdout.write(
+                    '{:<12}  {:<10}  {:>9.1f}  {:>7.2f}  '
+                    '{:>11.2f}  {:>11.2f}  {:>12}'.format(
+                        distribution, limit, *row
+                    )
+                )
+
+    def run(self, distribution, limit, options):
+        User.objects.bulk_create(
+            User(username=f'feed_bench_{i}')
+            for i in range(options['users'])
+        )
+        users = list(
+            User.objects.filter(username__startswith='feed_bench_')
+            .order_by('id').values_list('id', flat=True)
+        )
+        authors = users[:options['authors']]
+        counts = self.followers_per_author(
+            distribution, len(users), len(authors)
+        )
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id, count in zip(authors, counts)
+                for user_id in users[-count:]
+                if user_id != author_id
+            )
+        )
+        # bulk_create не вызывает сигналов: счётчики подписчиков
+        # пересчитываются, а режим подписок выбирает sync_author.
+        counters.reconcile_users()
+        with override_settings(FEED_FANOUT_LIMIT=limit):
+            for author_id in authors:
+                feed.sync_author(author_id)
+            started = time.perf_counter()
+            for _ in range(options['posts']):
+                for author_id in authors:
+                    Post.objects.create(author_id=author_id, text='bench')
+            write_time = time.perf_counter() - started
+            posts = options['posts'] * len(authors)
+            write_amp = FeedItem.objects.count() / posts
+
+            timings = []
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                for user_id in users[-options['reads']:]:
+                    started = time.perf_counter()
+                    paginator = MergedCursorPaginator(
+                        feed.feed_sources(User(pk=user_id)),
+                        POST_LIMIT,
+                        key='feed_pub_date',
+                        tiebreaker='feed_post_id',
+                    )
+                    paginator.cursor_page()
+                    timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return (
+            write_amp,
+            write_time * 1000 / posts,
+            statistics.median(timings),
+            timings[int(len(timings) * 0.95) - 1],
+            len(queries.captured_queries) // len(timings),
+        )
@@ -0,0 +1,94 @@
+import io
+import statistics
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts.images import normalize
+from posts.thumbnails import FORMATS, RATIO, WIDTHS
+
+# Карточка поста на экране шириной 360 CSS-пикселей (за вычетом полей)
+# при плотности пикселей 2.
+MOBILE_WIDTH = 660
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает объём файлов и время построения миниатюры для '
+        'исходных фотографий и для изображений после posts.images.normalize, '
+        'а также объём картинки, которую получает телефон, с одним кадром '
+        '960px JPEG и с вариантами из srcset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=5)
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+
+    def photo(self, width, height):
+        """Синтетическая «камерная» фотография с шумом и EXIF."""
+        image = Image.merge('RGB', [
+            Image.effect_noise((width, height), 40),
+            Image.linear_gradient('L').resize((width, height)),
+            Image.effect_noise((width, height), 20),
+        ])
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=95, exif=exif.tobytes())
+        return buffer.getvalue()
+
+    def variant(self, content, width, image_format='JPEG'):
+        image = Image.open(io.BytesIO(content))
+        image = ImageOps.fit(
+            image, (width, round(width * RATIO)), Image.LANCZOS
+        )
+        buffer = io.BytesIO()
+        image.save(
+            buffer, image_format,
+            quality=thumbnail_settings.THUMBNAIL_QUALITY
+        )
+        return buffer.getvalue()
+
+    def thumbnail_time(self, content):
+        started = time.perf_counter()
+        self.variant(content, WIDTHS[-1])
+        return (time.perf_counter() - started) * 1000
+
+    def mobile_bytes(self, content):
+        """Объём варианта, который браузер телефона выберет из srcset."""
+        width = next(
+            (width for width in WIDTHS if width >= MOBILE_WIDTH), WIDTHS[-1]
+        )
+        return len(self.variant(content, width, FORMATS[0]))
+
+    def handle(self, *args, **options):
+        rows = []
+        for _ in range(options['count']):
+            original = self.photo(options['width'], options['height'])
+            started = time.perf_counter()
+            stored = normalize(
+                SimpleUploadedFile('photo.jpg', original, 'image/jpeg')
+            ).read()
+            ingest = (time.perf_counter() - started) * 1000
+            rows.append((
+                len(original), len(stored), ingest,
+                self.thumbnail_time(original), self.thumbnail_time(stored),
+                len(self.variant(stored, 960)), self.mobile_bytes(stored),
+            ))
+        columns = list(zip(*rows))
+        self.stdout.write(
+            'bytes_before  bytes_after  ingest_ms  '
+            'thumb_ms_before  thumb_ms_after  '
+            'mobile_bytes_before  mobile_bytes_after'
+        )
+        self.stdout.write(
+            '{:>12.0f}  {:>11.0f}  {:>9.1f}  {:>15.1f}  {:>14.1f}  '
+            '{:>19.0f}  {:>18.0f}'.format(
+                *(statistics.median(column) for column in columns)
+            )
+        )
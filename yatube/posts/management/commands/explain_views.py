@@ -0,0 +1,106 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.urls import resolve, reverse
+
+from posts.models import Follow, Group, Post
+
+
+class QueryRecorder:
+    """execute_wrapper, запоминающий SELECT-запросы с параметрами."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN QUERY PLAN для запросов страниц ленты '
+        'и отмечает полные сканы таблиц и сортировки во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail',
+            action='store_true',
+            help='Завершаться с ошибкой, если найдены проблемные планы.'
+        )
+
+    def get_pages(self):
+        """Адреса страниц и пользователь, от имени которого их открывать."""
+        pages = [(reverse('posts:index'), AnonymousUser())]
+        group = Group.objects.first()
+        if group:
+            pages.append((
+                reverse('posts:group_posts', kwargs={'slug': group.slug}),
+                AnonymousUser()
+            ))
+        post = Post.objects.select_related('author').first()
+        if post:
+            pages.append((
+                reverse('posts:profile', kwargs={'username': post.author}),
+                post.author
+            ))
+            pages.append((
+                reverse('posts:post_detail', kwargs={'post_id': post.id}),
+                AnonymousUser()
+            ))
+        follow = Follow.objects.select_related('user').first()
+        if follow:
+            pages.append((reverse('posts:follow_index'), follow.user))
+        return pages
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def is_suspicious(step):
+        full_scan = step.startswith('SCAN') and 'INDEX' not in step
+        return full_scan or 'TEMP B-TREE' in step
+
+    def explain_page(self, factory, url, user):
+        """Печатает планы запросов страницы, возвращает число проблемных."""
+        flagged = 0
+        request = factory.get(url)
+        request.user = user
+        recorder = QueryRecorder()
+        match = resolve(url)
+        with connection.execute_wrapper(recorder):
+            match.func(request, *match.args, **match.kwargs)
+        self.stdout.write(self.style.MIGRATE_HEADING(url))
+        for sql, params in recorder.queries:
+            plan = self.explain(sql, params)
+            bad = [step for step in plan if self.is_suspicious(step)]
+            flagged += bool(bad)
+            style = self.style.WARNING if bad else self.style.SUCCESS
+            self.stdout.write(style(f'  {sql[:120]}'))
+            for step in plan:
+                marker = '!' if step in bad else ' '
+                self.stdout.write(f'    {marker} {step}')
+        return flagged
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Поддерживается только SQLite.')
+        factory = RequestFactory()
+        flagged = 0
+        with override_settings(CACHES=NO_CACHE):
+            for url, user in self.get_pages():
+                flagged += self.explain_page(factory, url, user)
+        summary = f'Запросов с полным сканом или сортировкой: {flagged}'
+        if flagged and options['fail']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты, комментарии или подписки из JSONL или CSV. '
+        'Поля постов: id, author, text, pub_date, group, image; '
+        'комментариев: id, post, author, text, created; '
+        'подписок: user, author. Авторы указываются по username '
+        '(недостающие пользователи создаются), группы — по slug. '
+        'Уже импортированные строки пропускаются, поэтому команду можно '
+        'запускать повторно на тех же данных. В файле выгрузки постов '
+        'и комментариев строки другого вида (поле type) пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importer.KINDS))
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument('--format', choices=importer.FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Строк в одном INSERT.')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Строк в одной транзакции.')
+        parser.add_argument('--defer-indexes', action='store_true',
+                            help='Строить индексы модели после импорта.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f'Нет файла {path}')
+        started = time.perf_counter()
+
+        def progress(report):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Строк: {report["rows"]}, импортировано: '
+                f'{report["imported"]}, {report["rows"] / elapsed:.0f} строк/с'
+            )
+
+        def errors(line, message):
+            self.stderr.write(f'Строка {line}: {message}')
+
+        file = (
+            sys.stdin if path == '-'
+            else open(path, newline='', encoding='utf-8')
+        )
+        try:
+            report = importer.Importer(
+                options['kind'],
+                batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+                errors=errors,
+            ).run(
+                importer.read_rows(file, format),
+                defer_indexes=options['defer_indexes']
+            )
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: строк {report["rows"]}, импортировано '
+            f'{report["imported"]}, пропущено с ошибками {report["invalid"]}, '
+            f'другого вида {report["other"]}, '
+            f'{report["rows"] / elapsed if elapsed else 0:.0f} строк/с'
+        ))
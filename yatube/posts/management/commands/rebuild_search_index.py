@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново заполняет поисковый индекс постов и комментариев '
+        '(например, после смены SEARCH_BACKEND).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько записей читать из базы за раз.'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        total = search.rebuild(
+            Post.objects.all(),
+            Comment.objects.all(),
+            chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано документов: {total} ({search.backend()})'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        users = counters.reconcile_users()
+        posts = counters.reconcile_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено пользователей: {users}, постов: {posts}'
+        ))
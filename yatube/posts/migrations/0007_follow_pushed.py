@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_feeditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='pushed',
+            field=models.BooleanField(default=True, help_text='Иначе посты автора подмешиваются в ленту при чтении', verbose_name='Посты раскладываются в ленту'),
+        ),
+    ]
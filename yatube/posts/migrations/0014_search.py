@@ -0,0 +1,109 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:02
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_search'
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Копия posts.search.tokenize на момент миграции."""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_RE.findall(text)
+
+
+def create_fts(apps, schema_editor):
+    """Таблица FTS5, если база — SQLite, собранная с FTS5."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            "post_id UNINDEXED, text, tokenize='unicode61')"
+        )
+    except OperationalError:
+        pass
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def fill_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchToken = apps.get_model('posts', 'SearchToken')
+    connection = schema_editor.connection
+    documents = (
+        (post_id * 2, post_id, text)
+        for post_id, text in Post.objects.values_list(
+            'id', 'text'
+        ).iterator()
+    ), (
+        (comment_id * 2 + 1, post_id, text)
+        for comment_id, post_id, text in Comment.objects.filter(
+            post__isnull=False
+        ).values_list('id', 'post_id', 'text').iterator()
+    )
+    use_fts = (
+        getattr(settings, 'SEARCH_BACKEND', 'auto') != 'python'
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+    for part in documents:
+        for doc, post_id, text in part:
+            tokens = tokenize(text)
+            if use_fts:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {FTS_TABLE} (rowid, post_id, text) '
+                        'VALUES (%s, %s, %s)',
+                        [doc, post_id, ' '.join(tokens)]
+                    )
+                continue
+            SearchToken.objects.bulk_create(
+                SearchToken(doc=doc, post_id=post_id, token=token[:64],
+                            count=count)
+                for token, count in Counter(tokens).items()
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc', models.BigIntegerField(help_text='id * 2 для поста, id * 2 + 1 для комментария', verbose_name='Документ')),
+                ('token', models.CharField(max_length=64, verbose_name='Слово')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Слова поискового индекса',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['token', 'doc'], name='search_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['doc'], name='search_doc_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from core.models import CreatedModel
+from core.storage import content_storage
 
 User = get_user_model()
 
@@ -31,6 +32,11 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        help_text='Меняется и при изменении автора или группы поста'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -49,13 +55,59 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_placeholder = models.CharField(
+        'Цвет-заглушка картинки',
+        max_length=7,
+        blank=True,
+        editable=False,
+        help_text='Преобладающий цвет, показывается до загрузки картинки'
+    )
+    image_hash = models.CharField(
+        'SHA-256 картинки',
+        max_length=64,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -86,6 +138,42 @@ class Comment(CreatedModel):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
+
+class SearchToken(models.Model):
+    """
+    Запасной поисковый индекс (posts.search), если SQLite FTS5
+    недоступен: слово документа и число его вхождений.
+    """
+    doc = models.BigIntegerField(
+        'Документ',
+        help_text='id * 2 для поста, id * 2 + 1 для комментария'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='search_tokens'
+    )
+    token = models.CharField('Слово', max_length=64)
+    count = models.PositiveIntegerField('Число вхождений', default=1)
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Слова поискового индекса'
+        indexes = [
+            models.Index(fields=['token', 'doc'], name='search_token_idx'),
+            models.Index(fields=['doc'], name='search_doc_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} в документе {self.doc}'
 
 
 class Follow(models.Model):
@@ -101,18 +189,87 @@ class Follow(models.Model):
         verbose_name='Хозяин подписки',
         related_name='following'
     )
+    pushed = models.BooleanField(
+        'Посты раскладываются в ленту',
+        default=True,
+        help_text='Иначе посты автора подмешиваются в ленту при чтении'
+    )
 
     class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],
                 name='unique followers'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'подписка {self.user.username} на {self.author.username}'
 
+
+class FeedItem(models.Model):
+    """Запись ленты подписок: пост автора, разложенный подписчику."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='feed_items'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='feed_items'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
     class Meta:
-        verbose_name = 'Подписка'
-        verbose_name_plural = 'Подписки'
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique feed item'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user.username}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'статистика {self.user.username}'
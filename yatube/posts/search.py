@@ -0,0 +1,315 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Основной индекс — виртуальная таблица SQLite FTS5 posts_search
+(создаётся миграцией 0014). Если FTS5 недоступен или в настройках
+выбран SEARCH_BACKEND = 'python', используется запасной индекс
+токенов SearchToken. Оба индекса обновляются сигналами (posts.signals).
+
+Документ индекса — текст поста или комментария; rowid документа
+поста равен id * 2, комментария — id * 2 + 1. Результаты группируются
+по постам: пост ранжируется по лучшему из своих документов.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import F
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import SearchToken
+from .utils import chunked
+
+FTS_TABLE = 'posts_search'
+TOKEN_RE = re.compile(r'\w+')
+TOKEN_MAX_LENGTH = SearchToken._meta.get_field('token').max_length
+# Слова запроса сверх этого числа отбрасываются.
+QUERY_MAX_TOKENS = 8
+
+
+def tokenize(text):
+    """
+    Слова текста в нижнем регистре без диакритики («ё» → «е»).
+
+    Этой же нормализацией проходит текст перед записью в FTS5,
+    поэтому оба индекса одинаково понимают запрос.
+    """
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_RE.findall(text)
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    return (
+        connection.vendor == 'sqlite'
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+
+
+def backend():
+    """
+    Активный индекс: 'fts5' или 'python'. Явно выбранный FTS5 без
+    таблицы posts_search — ошибка настройки, а не тихий переход
+    на запасной индекс.
+    """
+    choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if choice not in ('auto', 'fts5', 'python'):
+        raise ImproperlyConfigured(
+            f'Неизвестный SEARCH_BACKEND: {choice!r}.'
+        )
+    if choice == 'fts5' and not fts5_available():
+        raise ImproperlyConfigured(
+            'SEARCH_BACKEND = "fts5", но в базе нет таблицы FTS5 '
+            f'{FTS_TABLE}: нужен SQLite с FTS5 и миграция posts 0014.'
+        )
+    if choice == 'auto':
+        return 'fts5' if fts5_available() else 'python'
+    return choice
+
+
+def post_doc(post_id):
+    return post_id * 2
+
+
+def comment_doc(comment_id):
+    return comment_id * 2 + 1
+
+
+def _index(documents):
+    """Записывает документы (doc, post_id, text) в активный индекс."""
+    documents = [
+        (doc, post_id, tokenize(text)) for doc, post_id, text in documents
+    ]
+    if not documents:
+        return
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [[doc] for doc, _, _ in documents]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, post_id, text) '
+                'VALUES (%s, %s, %s)',
+                [
+                    [doc, post_id, ' '.join(tokens)]
+                    for doc, post_id, tokens in documents
+                ]
+            )
+        return
+    SearchToken.objects.filter(
+        doc__in=[doc for doc, _, _ in documents]
+    ).delete()
+    SearchToken.objects.bulk_create(
+        SearchToken(doc=doc, post_id=post_id, token=token, count=count)
+        for doc, post_id, tokens in documents
+        for token, count in Counter(
+            token[:TOKEN_MAX_LENGTH] for token in tokens
+        ).items()
+    )
+
+
+def _remove(doc):
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [doc]
+            )
+    else:
+        SearchToken.objects.filter(doc=doc).delete()
+
+
+def index_posts(posts):
+    _index((post_doc(post.pk), post.pk, post.text) for post in posts)
+
+
+def index_comments(comments):
+    _index(
+        (comment_doc(comment.pk), comment.post_id, comment.text)
+        for comment in comments if comment.post_id
+    )
+
+
+def index_post(post):
+    index_posts([post])
+
+
+def index_comment(comment):
+    if comment.post_id:
+        index_comments([comment])
+    else:
+        _remove(comment_doc(comment.pk))
+
+
+def remove_post(post_id):
+    _remove(post_doc(post_id))
+
+
+def remove_comment(comment_id):
+    _remove(comment_doc(comment_id))
+
+
+def clear():
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchToken.objects.all().delete()
+
+
+def rebuild(posts, comments, chunk_size=2000):
+    """Заполняет индекс заново. Возвращает число документов."""
+    clear()
+    total = 0
+    comments = comments.filter(post__isnull=False).only(
+        'id', 'post_id', 'text'
+    )
+    for queryset, index in (
+        (posts.only('id', 'text'), index_posts),
+        (comments, index_comments),
+    ):
+        for chunk in chunked(queryset.iterator(chunk_size=chunk_size),
+                             chunk_size):
+            index(chunk)
+            total += len(chunk)
+    return total
+
+
+def _terms(query):
+    return [
+        token[:TOKEN_MAX_LENGTH] for token in tokenize(query)
+    ][:QUERY_MAX_TOKENS]
+
+
+def _match(terms):
+    """Запрос MATCH: все слова запроса, каждое как префикс."""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _fts_page(terms, after, limit):
+    # ORDER BY во вложенном запросе не даёт SQLite развернуть его
+    # в GROUP BY, где функция ранжирования bm25 недоступна.
+    sql = (
+        'SELECT score, post_id FROM ('
+        'SELECT MIN(score) AS score, post_id FROM ('
+        f'SELECT rank AS score, post_id FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s ORDER BY rank'
+        ') GROUP BY post_id)'
+    )
+    params = [_match(terms)]
+    if after:
+        score, post_id = after
+        sql += ' WHERE score > %s OR (score = %s AND post_id > %s)'
+        params += [score, score, post_id]
+    sql += ' ORDER BY score, post_id LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _python_scores(terms, docs=None):
+    """
+    {doc: (score, post_id)} документов, содержащих все слова запроса.
+
+    Слово запроса совпадает с токенами, которые с него начинаются;
+    счёт документа — минус число вхождений, как у bm25: меньше — лучше.
+    """
+    found = None
+    for term in terms:
+        tokens = SearchToken.objects.filter(
+            token__gte=term, token__lt=term + '\U0010ffff'
+        )
+        if docs is not None:
+            tokens = tokens.annotate(kind=F('doc') % 2).filter(kind=docs)
+        hits = defaultdict(int)
+        posts = {}
+        for doc, post_id, count in tokens.values_list(
+            'doc', 'post_id', 'count'
+        ):
+            hits[doc] -= count
+            posts[doc] = post_id
+        if found is None:
+            found = {doc: (hits[doc], posts[doc]) for doc in hits}
+        else:
+            found = {
+                doc: (score + hits[doc], post_id)
+                for doc, (score, post_id) in found.items() if doc in hits
+            }
+        if not found:
+            break
+    return found or {}
+
+
+def _python_page(terms, after, limit):
+    best = {}
+    for score, post_id in _python_scores(terms).values():
+        best[post_id] = min(score, best.get(post_id, score))
+    rows = sorted((score, post_id) for post_id, score in best.items())
+    if after:
+        rows = [row for row in rows if row > tuple(after)]
+    return rows[:limit]
+
+
+def encode_cursor(score, post_id):
+    return urlsafe_base64_encode(f'{score!r}|{post_id}'.encode())
+
+
+def decode_cursor(cursor):
+    """Возвращает (score, post_id) или None для битого курсора."""
+    try:
+        score, post_id = urlsafe_base64_decode(cursor).decode().split('|')
+        return float(score), int(post_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def search(query, after=None, limit=10):
+    """
+    Страница результатов поиска: (post_id, ...) по убыванию
+    релевантности и курсор следующей страницы или None.
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], None
+    after = after and decode_cursor(after)
+    page = _fts_page if backend() == 'fts5' else _python_page
+    rows = page(terms, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*rows[-1])
+    return [post_id for score, post_id in rows], next_cursor
+
+
+def _ids(query, docs, limit):
+    terms = _terms(query)
+    if not terms:
+        return []
+    if backend() == 'fts5':
+        sql = (
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            'AND rowid %% 2 = %s ORDER BY rank LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [_match(terms), docs, limit])
+            found = [row[0] for row in cursor.fetchall()]
+    else:
+        scores = _python_scores(terms, docs)
+        found = sorted(scores, key=scores.get)[:limit]
+    return [doc // 2 for doc in found]
+
+
+def post_ids(query, limit=1000):
+    """id постов, в тексте которых есть все слова запроса."""
+    return _ids(query, 0, limit)
+
+
+def comment_ids(query, limit=1000):
+    """id комментариев, в тексте которых есть все слова запроса."""
+    return _ids(query, 1, limit)
@@ -0,0 +1,159 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import page_cache
+
+from . import cache, counters, feed, images, search
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._old_displayed = None
+    if raw or instance.pk is None or (
+        update_fields is not None
+        and not set(update_fields) & set(cache.DISPLAYED_USER_FIELDS)
+    ):
+        return
+    instance._old_displayed = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*cache.DISPLAYED_USER_FIELDS).first()
+
+
+def displayed_changed(user):
+    old = getattr(user, '_old_displayed', None)
+    return old is not None and old != tuple(
+        getattr(user, field) for field in cache.DISPLAYED_USER_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        page_cache.purge(f'author-{instance.pk}')
+    elif displayed_changed(instance):
+        Post.objects.filter(author=instance).update(updated_at=timezone.now())
+        cache.bump('users')
+        page_cache.purge(f'author-{instance.pk}')
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cache.bump('users')
+    page_cache.purge(f'author-{instance.pk}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Post.objects.filter(group=instance).update(updated_at=timezone.now())
+        cache.bump('groups')
+        page_cache.purge(f'group-{instance.pk}')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.pk:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+    if not instance.image:
+        description = images.clear_description()
+    elif not instance.image._committed:
+        description = images.describe(instance.image)
+    else:
+        return
+    for field, value in description.items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_post(instance)
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+        feed.push_post(instance)
+        page_cache.purge(
+            f'author-{instance.author_id}', *cache.list_keys(instance)
+        )
+    else:
+        feed.update_post(instance)
+        old_image = getattr(instance, '_old_image', '')
+        if old_image and old_image != instance.image.name:
+            images.release.delay(old_image)
+        keys = {f'post-{instance.pk}'}
+        if old_group_id != instance.group_id:
+            keys |= cache.list_keys(instance)
+            if old_group_id:
+                keys.add(f'group-{old_group_id}-list')
+        page_cache.purge(*keys)
+    cache.bump_post(instance, old_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+    counters.change_user(instance.author_id, posts_count=-1)
+    cache.bump_post(instance)
+    page_cache.purge(f'post-{instance.pk}', f'author-{instance.author_id}')
+    if instance.image:
+        images.release.delay(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_comment(instance)
+    if not instance.post_id:
+        return
+    # Правка комментария (например, в админке) тоже меняет страницу поста.
+    scopes = [f'post:{instance.post_id}']
+    if created:
+        counters.change_post(instance.post_id, comments_count=1)
+        scopes.append('comments')
+    cache.bump(*scopes)
+    page_cache.purge(f'comments-{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
+    if instance.post_id:
+        counters.change_post(instance.post_id, comments_count=-1)
+        cache.bump(f'post:{instance.post_id}', 'comments')
+        page_cache.purge(f'comments-{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        feed.follow(instance.user_id, instance.author_id)
+        cache.bump_author(instance.author_id, instance.user_id)
+        page_cache.purge(
+            f'author-{instance.author_id}', f'author-{instance.user_id}'
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    feed.unfollow(instance.user_id, instance.author_id)
+    cache.bump_author(instance.author_id, instance.user_id)
+    page_cache.purge(
+        f'author-{instance.author_id}', f'author-{instance.user_id}'
+    )
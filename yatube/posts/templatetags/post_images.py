@@ -0,0 +1,53 @@
+import logging
+
+from django import template
+from sorl.thumbnail import get_thumbnail
+
+from ..thumbnails import FORMATS, OPTIONS, RATIO, geometry, widths_for
+
+logger = logging.getLogger(__name__)
+register = template.Library()
+
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post, sizes='(min-width: 992px) 960px, 100vw'):
+    """
+    Изображение поста в нескольких ширинах и форматах: <picture>
+    с srcset, из которого браузер выбирает вариант под размер экрана.
+    Размеры кадра и цвет-заглушка берутся из полей поста, поэтому
+    разметка резервирует место под картинку до её загрузки.
+    Как и {% thumbnail %}, при ошибке чтения файла ничего не выводит.
+    """
+    if not post.image:
+        return {}
+    widths = widths_for(post.image_width)
+    sources = []
+    try:
+        for image_format in FORMATS:
+            variants = [
+                get_thumbnail(
+                    post.image, geometry(width),
+                    format=image_format, **OPTIONS
+                )
+                for width in widths
+            ]
+            sources.append({
+                'type': MIME_TYPES[image_format],
+                'srcset': ', '.join(
+                    f'{variant.url} {variant.width}w' for variant in variants
+                ),
+                'src': variants[-1].url,
+            })
+    except Exception:
+        logger.exception('Не удалось получить миниатюры для %s', post.image)
+        return {}
+    return {
+        'sources': sources[:-1],
+        'fallback': sources[-1],
+        'sizes': sizes,
+        'width': widths[-1],
+        'height': round(widths[-1] * RATIO),
+        'placeholder': post.image_placeholder,
+    }
@@ -0,0 +1,150 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, User
+from ..utils import POST_LIMIT
+
+
+class ApiTests(TestCase):
+    """JSON API лент: курсоры, выбор полей, пакетная выдача и ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(POST_LIMIT + 3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_lists_paginate_with_cursors(self):
+        urls = (
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:api_author_posts', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                second = self.client.get(
+                    url, {'after': first['next']}
+                ).json()
+                self.assertEqual(len(first['results']), POST_LIMIT)
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next'])
+                self.assertEqual(first['results'][0]['author'], 'auth')
+                self.assertEqual(first['results'][0]['group'], 'test-slug')
+
+    def test_fields_limit_loaded_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:api_posts'), {'fields': 'id,author'}
+            )
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'author'}
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"text"', queries[0]['sql'])
+
+    def test_unknown_field_rejected(self):
+        response = self.client.get(
+            reverse('posts:api_posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_batch_lookup_by_ids(self):
+        wanted = [self.posts[2].pk, 0, self.posts[0].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('posts:api_posts'),
+                {'ids': ','.join(map(str, wanted)), 'fields': 'id,text'}
+            )
+        data = response.json()
+        self.assertEqual(
+            [post['id'] for post in data['results']], wanted[::2]
+        )
+        self.assertEqual(data['missing'], [0])
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:api_posts'), {'ids': 'a,b'}
+            ).status_code,
+            400
+        )
+
+    def test_detail_and_not_found(self):
+        post = self.posts[0]
+        response = self.client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.json()['text'], post.text)
+        cases = (
+            reverse('posts:api_post_detail', kwargs={'post_id': 0}),
+            reverse('posts:api_group_posts', kwargs={'slug': 'missing'}),
+            reverse('posts:api_author_posts', kwargs={'username': 'nobody'}),
+        )
+        for url in cases:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_etag_revalidation(self):
+        url = reverse('posts:api_posts')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(cached.status_code, 304)
+        other = self.client.get(url, {'fields': 'id'})
+        self.assertNotEqual(other['ETag'], response['ETag'])
+
+
+class ApiInvalidationTests(TransactionTestCase):
+    """Ответы API с comments_count обновляются после комментария."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='test-slug')
+        self.post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group
+        )
+
+    def tearDown(self):
+        search.clear()
+
+    def test_comment_refreshes_counts(self):
+        urls = (
+            reverse('posts:api_posts'),
+            reverse('posts:api_posts') + f'?ids={self.post.pk}',
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:api_author_posts', kwargs={'username': 'auth'}),
+            reverse('posts:api_post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        responses = {url: self.client.get(url) for url in urls}
+        self.post.comments.create(author=self.user, text='Комментарий')
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                fresh = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(fresh.status_code, 200)
+                self.assertEqual(fresh['X-Cache'], 'MISS')
+                data = fresh.json()
+                post = data['results'][0] if 'results' in data else data
+                self.assertEqual(post['comments_count'], 1)
@@ -1,8 +1,16 @@
 
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
 from django.urls import reverse
 
+from core import page_cache, tasks
+
+from ..cache import conditional, index_version
 from ..models import Group, Post, User
 
 
@@ -49,3 +57,320 @@ class CacheTests(TestCase):
             index_page_after,
             'Кеширование не работает'
         )
+
+    def test_cached_feeds_skip_database(self):
+        """
+        Лента, собранная заново после очистки полностраничного кеша,
+        берётся из кеша фрагментов без обращения к базе.
+        """
+        cache.clear()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                page_cache.purge(*first['Surrogate-Key'].split())
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(
+                    [post.text for post in second.context['page_obj']],
+                    ['Тестовый пост 1']
+                )
+
+    def test_junk_page_params_share_first_page(self):
+        """Битые курсоры и номера не создают новых записей в кеше."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.guest_client.get(url, {'page': 1})
+        junk = ({'after': 'мусор'}, {'before': '!!'}, {'page': 'x'},
+                {'page': '-5'}, {'page': '100'})
+        for params in junk:
+            with self.subTest(params=params):
+                page_cache.purge('feed')
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url, params)
+                self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_cached_author_has_no_private_fields(self):
+        self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        cached = [
+            value for value in cache._cache.values()
+            if b'pbkdf2' in value or b'password' in value
+        ]
+        self.assertEqual(cached, [])
+
+
+class CacheInvalidationTests(TransactionTestCase):
+    """Изменения постов, групп и авторов сразу обновляют фрагменты лент."""
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост 1',
+            group=self.group,
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+
+    def assert_pages_contain(self, text):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), text)
+
+    def test_new_post_shown_immediately(self):
+        self.assert_pages_contain('Тестовый пост 1')
+        Post.objects.create(
+            author=self.user,
+            text='Тестовый пост 2',
+            group=self.group,
+        )
+        self.assert_pages_contain('Тестовый пост 2')
+
+    def test_edit_and_delete_refresh_pages(self):
+        self.assert_pages_contain('Тестовый пост 1')
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assert_pages_contain('Исправленный пост')
+        self.post.delete()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.guest_client.get(url), 'Исправленный пост'
+                )
+
+    def test_author_change_refreshes_pages(self):
+        self.assert_pages_contain('Тестовый пост 1')
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        self.assert_pages_contain('Лев Толстой')
+
+    def test_login_does_not_invalidate(self):
+        version = index_version()
+        self.client.force_login(self.user)
+        self.assertEqual(index_version(), version)
+
+
+class PageCacheTests(TransactionTestCase):
+    """Полностраничный кеш гостей очищается по суррогатным ключам."""
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+        )
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост 1',
+            group=self.group,
+        )
+        self.other = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост 2',
+        )
+        self.index = reverse('posts:index')
+        self.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.other_detail = reverse(
+            'posts:post_detail', kwargs={'post_id': self.other.pk}
+        )
+
+    def assert_cached(self, url, hit=True):
+        self.assertEqual(
+            self.guest_client.get(url)['X-Cache'], 'HIT' if hit else 'MISS'
+        )
+
+    def test_surrogate_keys(self):
+        keys = set(self.guest_client.get(self.detail)['Surrogate-Key'].split())
+        self.assertEqual(keys, {
+            f'post-{self.post.pk}', f'comments-{self.post.pk}',
+            f'author-{self.user.pk}', f'group-{self.group.pk}',
+        })
+        keys = set(self.guest_client.get(self.index)['Surrogate-Key'].split())
+        self.assertIn('feed', keys)
+        self.assertIn(f'post-{self.other.pk}', keys)
+
+    def test_authorized_not_cached(self):
+        self.client.force_login(self.user)
+        self.client.get(self.index)
+        response = self.client.get(self.index)
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_comment_purges_only_post_detail(self):
+        for url in (self.index, self.detail, self.other_detail):
+            self.assert_cached(url, hit=False)
+        self.post.comments.create(author=self.user, text='Комментарий')
+        self.assert_cached(self.detail, hit=False)
+        self.assert_cached(self.other_detail)
+        self.assert_cached(self.index)
+
+    def test_edit_purges_pages_with_post(self):
+        for url in (self.index, self.detail, self.other_detail):
+            self.assert_cached(url, hit=False)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.guest_client.get(self.index), 'Исправленный')
+        self.assert_cached(self.detail, hit=False)
+        self.assert_cached(self.other_detail)
+
+    @override_settings(SURROGATE_PURGE_URLS=['http://proxy.local/'])
+    def test_purge_forwarded_to_proxy(self):
+        with mock.patch('core.page_cache.requests.request') as request:
+            page_cache.purge('feed', 'post-1')
+            tasks.run_pending()
+        request.assert_called_once_with(
+            'PURGE', 'http://proxy.local/',
+            headers={'Surrogate-Key': 'feed post-1'},
+            timeout=2
+        )
+
+
+class ConditionalGetTests(TransactionTestCase):
+    """Неизменившиеся страницы отдаются ответом 304 без запросов к базе."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='test-slug')
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(0):
+                    self.assertEqual(
+                        self.revalidate(url, response).status_code, 304
+                    )
+                self.assertEqual(self.client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                ).status_code, 304)
+
+    def test_changes_invalidate(self):
+        responses = {url: self.client.get(url) for url in self.urls}
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 200)
+
+    def test_comment_invalidates_post_detail(self):
+        url = self.urls[-1]
+        response = self.client.get(url)
+        self.post.comments.create(author=self.user, text='Комментарий')
+        self.assertContains(self.revalidate(url, response), 'Комментарий')
+
+    def test_edited_comment_invalidates_post_detail(self):
+        comment = self.post.comments.create(author=self.user, text='Было')
+        url = self.urls[-1]
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        comment.text = 'Стало'
+        comment.save()
+        self.assertContains(self.revalidate(url, response), 'Стало')
+
+    def test_post_detail_ignores_other_authors(self):
+        url = self.urls[-1]
+        response = self.client.get(url)
+        other = User.objects.create_user(username='other')
+        Post.objects.create(author=other, text='Чужой пост', group=self.group)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        Post.objects.create(author=self.user, text='Ещё пост')
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_version_computed_once(self):
+        version = mock.Mock(return_value=index_version())
+        view = conditional(version)(lambda request: HttpResponse())
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).status_code, 200)
+        version.assert_called_once_with()
+
+    def test_etag_depends_on_user(self):
+        url = self.urls[0]
+        response = self.client.get(url)
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+
+class PostCardCacheTests(TransactionTestCase):
+    """Карточки постов кешируются по (id, updated_at) и переиспользуются."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='test-slug')
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.url = reverse('posts:index')
+
+    def test_card_reused_after_page_invalidation(self):
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без отметки')
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Новый пост')
+        self.assertContains(response, 'Тестовый пост')
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), 'Исправленный пост')
+
+    def test_related_changes_touch_posts(self):
+        self.client.get(self.url)
+        updated_at = self.post.updated_at
+        self.user.first_name = 'Лев'
+        self.user.save()
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated_at, updated_at)
+        self.assertContains(self.client.get(self.url), 'Лев')
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertContains(self.client.get(self.url), 'new-slug')
+        self.group.delete()
+        self.assertNotContains(self.client.get(self.url), 'new-slug')
+
+    def test_hidden_user_changes_keep_caches(self):
+        updated_at = self.post.updated_at
+        version = index_version()
+        self.user.set_password('new-password')
+        self.user.email = 'auth@example.com'
+        self.user.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated_at, updated_at)
+        self.assertEqual(index_version(), version)
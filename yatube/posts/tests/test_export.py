@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+from .test_forms import SMALL_GIF
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    """Потоковая выгрузка постов и комментариев."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(5)
+        ]
+        cls.posts[0].image = SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif'
+        )
+        cls.posts[0].save()
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.user, text='Свой комментарий'
+        )
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:profile_export', kwargs={'username': 'auth'})
+
+    def test_profile_export_jsonl(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertIn('yatube-auth.jsonl', response['Content-Disposition'])
+        records = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(
+            [record['type'] for record in records], ['post'] * 5 + ['comment']
+        )
+        self.assertEqual(records[0]['image'], self.posts[0].image.name)
+        self.assertEqual(records[1]['group'], 'test-slug')
+        self.assertEqual(records[-1]['post'], self.posts[1].pk)
+
+    def test_profile_export_csv(self):
+        response = self.client.get(self.url, {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[2]['text'], 'Пост 2')
+
+    def test_export_permissions(self):
+        cases = (
+            (reverse('posts:profile_export', kwargs={'username': 'other'}),
+             403),
+            (reverse('posts:group_export', kwargs={'slug': 'test-slug'}),
+             302),
+        )
+        for url, status in cases:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, status)
+        self.client.force_login(self.admin)
+        for url, _ in cases:
+            with self.subTest(url=url, user='admin'):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_zip_with_images(self):
+        response = self.client.get(self.url, {'images': '1'})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        image = f'images/{self.posts[0].image.name}'
+        self.assertEqual(
+            sorted(archive.namelist()), sorted(['yatube-auth.jsonl', image])
+        )
+        self.assertEqual(archive.read(image), SMALL_GIF)
+        self.assertEqual(
+            len(archive.read('yatube-auth.jsonl').splitlines()), 6
+        )
+
+    def test_admin_action(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': 'export_csv',
+                '_selected_action': [self.posts[1].pk, self.posts[2].pk],
+            }
+        )
+        rows = list(csv.DictReader(io.StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Пост 1'), ('post', 'Пост 2'),
+             ('comment', 'Свой комментарий')]
+        )
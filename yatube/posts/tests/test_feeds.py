@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class FeedTests(TransactionTestCase):
+    """RSS и Atom ленты: содержимое, кеш и условный GET."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        self.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание группы'
+        )
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.urls = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', kwargs={'slug': 'test-slug'}):
+                'application/rss+xml',
+            reverse('posts:group_atom', kwargs={'slug': 'test-slug'}):
+                'application/atom+xml',
+            reverse('posts:author_rss', kwargs={'username': 'auth'}):
+                'application/rss+xml',
+            reverse('posts:author_atom', kwargs={'username': 'auth'}):
+                'application/atom+xml',
+        }
+
+    def test_feeds_render(self):
+        for url, content_type in self.urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type
+                ))
+                self.assertContains(response, 'Тестовый пост')
+                self.assertContains(response, 'Лев Толстой')
+                self.assertContains(
+                    response,
+                    reverse('posts:post_detail', args=[self.post.pk])
+                )
+
+    def test_missing_group_or_author(self):
+        urls = (
+            reverse('posts:group_rss', kwargs={'slug': 'missing'}),
+            reverse('posts:author_atom', kwargs={'username': 'nobody'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unchanged_poll_skips_database(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    ).status_code, 304)
+                    self.assertEqual(self.client.get(
+                        url,
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                    ).status_code, 304)
+                    self.assertEqual(
+                        self.client.get(url)['X-Cache'], 'HIT'
+                    )
+
+    def test_new_post_invalidates(self):
+        responses = {url: self.client.get(url) for url in self.urls}
+        Post.objects.create(
+            author=self.user, text='Свежий пост', group=self.group
+        )
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                fresh = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertContains(fresh, 'Свежий пост')
+
+    def test_cached_items_have_no_private_fields(self):
+        self.client.get(reverse('posts:index_rss'))
+        self.assertFalse([
+            value for value in cache._cache.values() if b'password' in value
+        ])
@@ -1,7 +1,14 @@
-from django.test import Client, TestCase
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 
-from ..models import Post, User
+from core import tasks
+
+from .. import search
+from ..models import FeedItem, Follow, Post, User
 
 
 class FollowTests(TestCase):
@@ -60,3 +67,128 @@ class FollowTests(TestCase):
             unfollowed_posts,
             'Отписка от автора не работает'
         )
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+
+    def feed_ids(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page_obj']]
+
+    def test_feed_filled_on_follow_and_post(self):
+        """Лента заполняется при подписке и при публикации поста."""
+        self.assertEqual(self.feed_ids(), [])
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        self.assertEqual(self.feed_ids(), [self.old_post.id])
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.feed_ids(), [new_post.id, self.old_post.id])
+        new_post.delete()
+        self.assertEqual(self.feed_ids(), [self.old_post.id])
+
+    def test_feed_cleared_on_unfollow(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': self.author})
+        )
+        self.assertFalse(FeedItem.objects.filter(user=self.follower).exists())
+
+    def test_backfill_command(self):
+        Follow.objects.bulk_create(
+            [Follow(user=self.follower, author=self.author)]
+        )
+        self.assertEqual(self.feed_ids(), [])
+        call_command('backfill_feed', stdout=StringIO())
+        call_command('backfill_feed', stdout=StringIO())
+        self.assertEqual(self.feed_ids(), [self.old_post.id])
+
+    def test_benchmark_respects_limit(self):
+        stdout = StringIO()
+        call_command(
+            'benchmark_feed', '--users=40', '--authors=3', '--posts=1',
+            '--reads=5', '--limits', '0', '1000000000',
+            '--distributions', 'uniform', stdout=stdout
+        )
+        write_amp = {
+            int(row.split()[1]): float(row.split()[2])
+            for row in stdout.getvalue().splitlines()[1:]
+        }
+        self.assertEqual(write_amp[0], 0)
+        self.assertGreater(write_amp[10 ** 9], 0)
+
+
+@override_settings(FEED_FANOUT_LIMIT=1)
+class HybridFeedTests(TransactionTestCase):
+    """
+    Авторы сверх FEED_FANOUT_LIMIT подмешиваются в ленту при чтении.
+    Режим подписок переключает задача sync_author из очереди.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.another_reader = User.objects.create_user(username='another')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def tearDown(self):
+        search.clear()
+
+    def feed_ids(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page_obj']]
+
+    def test_follow_is_pulled_until_synced(self):
+        post = Post.objects.create(author=self.author, text='Пост 1')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.refresh_from_db()
+        self.assertFalse(follow.pushed)
+        self.assertEqual(self.feed_ids(), [post.id])
+        tasks.run_pending()
+        follow.refresh_from_db()
+        self.assertTrue(follow.pushed)
+        self.assertTrue(FeedItem.objects.filter(post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_popular_author_is_pulled(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        tasks.run_pending()
+        pushed = Post.objects.create(author=self.author, text='Пост 1')
+        Follow.objects.create(user=self.another_reader, author=self.author)
+        tasks.run_pending()
+        pulled = Post.objects.create(author=self.author, text='Пост 2')
+        self.assertTrue(FeedItem.objects.filter(post=pushed).exists())
+        self.assertFalse(FeedItem.objects.filter(post=pulled).exists())
+        self.assertFalse(
+            Follow.objects.filter(author=self.author, pushed=True).exists()
+        )
+        self.assertEqual(self.feed_ids(), [pulled.id, pushed.id])
+
+    def test_author_back_under_limit_is_pushed_again(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.another_reader, author=self.author)
+        tasks.run_pending()
+        pulled = Post.objects.create(author=self.author, text='Пост 1')
+        Follow.objects.get(user=self.another_reader).delete()
+        tasks.run_pending()
+        pushed = Post.objects.create(author=self.author, text='Пост 2')
+        self.assertEqual(
+            set(FeedItem.objects.values_list('post_id', flat=True)),
+            {pulled.id, pushed.id}
+        )
+        self.assertEqual(self.feed_ids(), [pushed.id, pulled.id])
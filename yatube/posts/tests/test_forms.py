@@ -1,15 +1,38 @@
+import io
+import os
 import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+
+from core import tasks
+from core.models import Job
+from core.storage import content_storage
 
 from ..forms import CommentForm, PostForm
+from ..images import normalize
 from ..models import Comment, Group, Post, User
+from ..thumbnails import WIDTHS, sizes, widths_for
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -23,14 +46,7 @@ class PostCreateFormTests(TestCase):
             slug='test-slug',
             description='Тестовое описание',
         )
-        cls.small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
+        cls.small_gif = SMALL_GIF
         cls.uploaded = SimpleUploadedFile(
             name='small.gif',
             content=cls.small_gif,
@@ -75,13 +91,12 @@ class PostCreateFormTests(TestCase):
             )
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
-        self.assertTrue(
-            Post.objects.filter(
-                group__title='Тестовая группа',
-                text='Тестовый текст',
-                image='posts/small.gif',
-            ).exists()
+        post = Post.objects.get(
+            group__title='Тестовая группа',
+            text='Тестовый текст',
         )
+        digest = post.image_hash
+        self.assertEqual(post.image.name, f'posts/{digest[:2]}/{digest}.gif')
 
     def test_edit_post(self):
         """Проверка изменения существующей записи в БД"""
@@ -159,3 +174,241 @@ class CommentCreateFormTests(TestCase):
             follow=True
         )
         self.assertEqual(Comment.objects.count(), com_count)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TransactionTestCase):
+    """Миниатюры строятся при сохранении поста, а не при первом показе."""
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def thumbnails(self):
+        found = []
+        for _, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache')):
+            found.extend(files)
+        return found
+
+    def test_thumbnails_built_on_upload(self):
+        uploaded = SimpleUploadedFile(
+            name='small.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        self.assertEqual(self.thumbnails(), [])
+        self.assertEqual(tasks.run_pending(), 1)
+        post = Post.objects.get()
+        built = self.thumbnails()
+        self.assertEqual(len(built), len(sizes(post.image_width)))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(sorted(self.thumbnails()), sorted(built))
+
+    def test_image_metadata_stored(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertRegex(post.image_placeholder, r'^#[0-9a-f]{6}$')
+        self.assertEqual(len(post.image_hash), 64)
+        post.image = None
+        post.save()
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_hash, '')
+
+    def test_backfill_image_metadata(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Старый пост',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Post.objects.create(
+            author=self.user, text='Пропавший файл', image='posts/none.gif'
+        )
+        Post.objects.update(
+            image_width=None, image_height=None,
+            image_placeholder='', image_hash=''
+        )
+        call_command(
+            'backfill_image_metadata', batch_size=1,
+            stdout=io.StringIO(), stderr=io.StringIO()
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_width, 2)
+        self.assertEqual(len(post.image_hash), 64)
+
+    @override_settings(POST_IMAGE_RELEASE_GRACE=0)
+    def test_duplicate_uploads_share_file(self):
+        posts = [
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост {number}',
+                image=SimpleUploadedFile(
+                    f'copy{number}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            for number in range(2)
+        ]
+        self.assertEqual(posts[0].image.name, posts[1].image.name)
+        name = posts[0].image.name
+        posts[0].delete()
+        tasks.run_pending()
+        self.assertTrue(content_storage.exists(name))
+        posts[1].delete()
+        tasks.run_pending()
+        self.assertFalse(content_storage.exists(name))
+
+    def test_release_spares_recent_upload(self):
+        """
+        Файл, который только что загрузили повторно, не удаляется:
+        ссылающийся на него пост мог ещё не зафиксироваться.
+        """
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        name = post.image.name
+        post.delete()
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertTrue(content_storage.exists(name))
+        job = Job.objects.get(status=Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_missing_file_written_again(self):
+        first = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        os.remove(content_storage.path(first.image.name))
+        second = Post.objects.create(
+            author=self.user,
+            text='Та же картинка',
+            image=SimpleUploadedFile('copy.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.assertEqual(second.image.name, first.image.name)
+        with content_storage.open(second.image.name) as file:
+            self.assertEqual(file.read(), SMALL_GIF)
+
+    def test_backfill_thumbnails_resumes(self):
+        Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint.json')
+        output = io.StringIO()
+        call_command(
+            'backfill_thumbnails', workers=0, checkpoint=checkpoint,
+            stdout=output
+        )
+        self.assertIn('Готово: 1 картинок', output.getvalue())
+        self.assertEqual(len(self.thumbnails()), len(sizes(2)))
+        output = io.StringIO()
+        call_command(
+            'backfill_thumbnails', workers=0, checkpoint=checkpoint,
+            stdout=output
+        )
+        self.assertIn('Готово: 0 картинок', output.getvalue())
+
+    def test_variants_not_wider_than_source(self):
+        self.assertEqual(widths_for(None), WIDTHS)
+        self.assertEqual(widths_for(100), WIDTHS[:1])
+        self.assertEqual(widths_for(800), (360, 720))
+
+    def test_edit_without_image_schedules_nothing(self):
+        post = Post.objects.create(author=self.user, text='Текст')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Новый текст'},
+        )
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=100)
+class ImageIngestionTests(TestCase):
+    """Загруженные изображения ограничиваются и очищаются от EXIF."""
+
+    def upload(self, name='photo.jpg', size=(400, 200), image_format='JPEG',
+               mode='RGB', **options):
+        buffer = io.BytesIO()
+        Image.new(mode, size, 'red').save(buffer, image_format, **options)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def test_large_image_capped_and_exif_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        stored = normalize(self.upload(exif=exif.tobytes()))
+        image = Image.open(stored)
+        self.assertEqual(image.size, (100, 50))
+        self.assertEqual(image.format, 'JPEG')
+        self.assertNotIn('exif', image.info)
+
+    def test_orientation_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        stored = normalize(self.upload(exif=exif.tobytes()))
+        self.assertEqual(Image.open(stored).size, (50, 100))
+
+    def test_unsupported_format_reencoded(self):
+        stored = normalize(self.upload('photo.bmp', image_format='BMP'))
+        self.assertEqual(stored.name, 'photo.jpg')
+        self.assertEqual(Image.open(stored).format, 'JPEG')
+        stored = normalize(self.upload(
+            'logo.tiff', image_format='TIFF', mode='RGBA'
+        ))
+        self.assertEqual(stored.name, 'logo.png')
+
+    def animation(self, frames=3, size=(400, 200)):
+        images = [
+            Image.new('RGB', size, color) for color in ('red', 'green', 'blue')
+        ][:frames]
+        buffer = io.BytesIO()
+        images[0].save(
+            buffer, 'GIF', save_all=True, append_images=images[1:],
+            duration=[50, 60, 70][:frames], loop=0,
+            comment=b'secret'
+        )
+        return SimpleUploadedFile('anim.gif', buffer.getvalue())
+
+    def test_animation_frames_resized(self):
+        image = Image.open(normalize(self.animation()))
+        self.assertEqual(image.format, 'GIF')
+        self.assertEqual(image.size, (100, 50))
+        self.assertEqual(image.n_frames, 3)
+        self.assertNotIn('comment', image.info)
+        durations = []
+        for number in range(image.n_frames):
+            image.seek(number)
+            durations.append(image.info['duration'])
+        self.assertEqual(durations, [50, 60, 70])
+
+    @override_settings(POST_IMAGE_MAX_ANIMATION_PIXELS=200000)
+    def test_long_animation_rejected(self):
+        with self.assertRaises(ValidationError):
+            normalize(self.animation())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_decompression_bomb_rejected(self):
+        with self.assertRaises(ValidationError):
+            normalize(self.upload())
+        form = PostForm(
+            {'text': 'Бомба'}, files={'image': self.upload()}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
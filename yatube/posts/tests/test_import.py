@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from .. import exporter, importer, search
+from ..models import Comment, FeedItem, Follow, Group, Post, User
+
+POSTS = [
+    {'id': 100, 'author': 'leo', 'text': 'Война и мир',
+     'pub_date': '2020-01-02T10:00:00+00:00', 'group': 'books'},
+    {'id': 101, 'author': 'leo', 'text': 'Анна Каренина',
+     'pub_date': '2020-01-03T10:00:00+00:00'},
+    {'id': 102, 'author': 'anton', 'text': 'Чайка', 'group': 'missing'},
+    {'id': 'x', 'author': 'anton', 'text': 'Без id'},
+]
+COMMENTS = (
+    'id,post,author,text,created\n'
+    '500,100,anton,Прочитал войну,2020-01-05T00:00:00\n'
+    '501,100,fyodor,И я,\n'
+    '502,999,fyodor,К несуществующему посту,\n'
+)
+FOLLOWS = [
+    {'user': 'anton', 'author': 'leo'},
+    {'user': 'fyodor', 'author': 'leo'},
+    {'user': 'leo', 'author': 'leo'},
+]
+
+
+class ImportTests(TransactionTestCase):
+    """Массовый импорт: даты и id из файла, повторный запуск, индексы."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        Group.objects.create(title='Книги', slug='books', description='')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        search.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            if isinstance(content, list):
+                content = '\n'.join(json.dumps(row) for row in content)
+            file.write(content)
+        return path
+
+    def run_import(self, kind, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_data', kind, path, *args, stdout=stdout, stderr=stderr
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_posts_import_is_idempotent(self):
+        path = self.write('posts.jsonl', POSTS + ['не объект'])
+        output, errors = self.run_import('posts', path, '--chunk-size=2')
+        self.assertIn('импортировано 2', output)
+        self.assertIn('строк/с', output)
+        self.assertIn('Строка 3: нет группы missing', errors)
+        self.assertIn('Строка 4: id — не целое число', errors)
+        self.assertIn('Строка 5', errors)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.author.username, 'leo')
+        self.assertEqual(post.group.slug, 'books')
+        self.assertEqual(
+            post.pub_date.isoformat(), '2020-01-02T10:00:00+00:00'
+        )
+        self.assertEqual(post.author.stats.posts_count, 2)
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(search.search('каренина')[0], [101])
+
+        output, _ = self.run_import('posts', path)
+        self.assertIn('импортировано 0', output)
+        self.assertEqual(Post.objects.count(), 2)
+        new = Post.objects.create(author=post.author, text='Новый')
+        self.assertGreater(new.pk, 101)
+
+    def test_comments_and_follows(self):
+        self.run_import('posts', self.write('posts.jsonl', POSTS[:2]))
+        _, errors = self.run_import(
+            'comments', self.write('comments.csv', COMMENTS)
+        )
+        self.assertIn('нет поста 999', errors)
+        self.assertEqual(
+            list(Comment.objects.values_list('pk', flat=True)), [500, 501]
+        )
+        self.assertEqual(Post.objects.get(pk=100).comments_count, 2)
+
+        path = self.write('follows.jsonl', FOLLOWS)
+        self.run_import('follows', path)
+        self.run_import('follows', path)
+        leo = User.objects.get(username='leo')
+        self.assertEqual(Follow.objects.filter(author=leo).count(), 2)
+        self.assertEqual(leo.stats.followers_count, 2)
+        self.assertEqual(
+            FeedItem.objects.filter(user__username='anton').count(), 2
+        )
+
+    def test_bad_rows_create_no_users(self):
+        path = self.write('posts.jsonl', [
+            {'id': 1, 'author': 'a/b', 'text': 'Слэш в имени'},
+            {'id': 2, 'author': 'a b', 'text': 'Пробел в имени'},
+            {'id': 3, 'author': 'x' * 151, 'text': 'Длинное имя'},
+            {'id': 4, 'author': 'orphan', 'text': 'Нет группы',
+             'group': 'missing'},
+        ])
+        _, errors = self.run_import('posts', path)
+        self.assertEqual(
+            errors.count('author — недопустимое имя пользователя'), 3
+        )
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Post.objects.exists())
+
+    def test_import_inside_transaction(self):
+        path = self.write('posts.jsonl', POSTS[:2])
+        with transaction.atomic():
+            self.run_import('posts', path)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_deferred_indexes_are_rebuilt(self):
+        self.run_import(
+            'posts', self.write('posts.jsonl', POSTS[:2]), '--defer-indexes'
+        )
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        for index in Post._meta.indexes:
+            with self.subTest(index=index.name):
+                self.assertIn(index.name, constraints)
+
+    def test_export_round_trip(self):
+        """Выгрузка загружается обратно командами posts и comments."""
+        leo = User.objects.create_user(username='leo')
+        post = Post.objects.create(
+            author=leo, text='Война и мир',
+            group=Group.objects.get(slug='books')
+        )
+        Post.objects.create(author=leo, text='Без группы')
+        Comment.objects.create(post=post, author=leo, text='Прочитал')
+        posts = Post.objects.values_list(
+            'id', 'author__username', 'group__slug', 'text', 'pub_date'
+        )
+        comments = Comment.objects.values_list(
+            'id', 'post_id', 'author__username', 'text', 'created'
+        )
+        expected = list(posts), list(comments)
+        for format in importer.FORMATS:
+            with self.subTest(format=format):
+                response = exporter.export_response(
+                    'dump', posts=Post.objects.all(),
+                    comments=Comment.objects.all(), format=format
+                )
+                path = self.write(
+                    f'dump.{format}',
+                    b''.join(response.streaming_content).decode()
+                )
+                Post.objects.all().delete()
+                _, errors = self.run_import('posts', path)
+                self.assertEqual(errors, '')
+                _, errors = self.run_import('comments', path)
+                self.assertEqual(errors, '')
+                self.assertEqual((list(posts), list(comments)), expected)
@@ -0,0 +1,160 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from core.decorators import QueryBudgetExceeded, query_budget
+
+from ..models import Comment, Follow, Group, Post, User
+from .test_forms import SMALL_GIF
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Число запросов страниц не зависит от числа записей на них."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_queries(self):
+        counts = {}
+        for url in self.urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            counts[url] = len(queries)
+        return counts
+
+    def test_queries_do_not_grow_with_page_size(self):
+        before = self.count_queries()
+        for i in range(15):
+            author = User.objects.create_user(username=f'user{i}')
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(author=author, text='Пост', group=self.group)
+            Comment.objects.create(post=self.post, author=author, text='Ок')
+        self.assertEqual(self.count_queries(), before)
+
+    def test_budget_exceeded(self):
+        @query_budget(0)
+        def view(request):
+            return list(User.objects.all())
+
+        with self.assertRaises(QueryBudgetExceeded):
+            view(None)
+        with self.settings(QUERY_BUDGET_STRICT=False):
+            with self.assertLogs('core.decorators', 'WARNING'):
+                view(None)
+
+
+class ExplainViewsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=cls.user, text='Пост', group=cls.group)
+
+    def test_feeds_use_composite_indexes(self):
+        """Ленты читаются по составным индексам без сортировки."""
+        out = StringIO()
+        call_command('explain_views', stdout=out)
+        plans = out.getvalue()
+        for index in ('post_pub_date_idx',
+                      'post_group_pub_date_idx',
+                      'post_author_pub_date_idx'):
+            with self.subTest(index=index):
+                self.assertIn(index, plans)
+        self.assertNotIn('!', plans)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailStoreTests(TestCase):
+    """Метаданные миниатюр на тёплом кеше не требуют запросов к базе."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='auth')
+        for number in range(10):
+            Post.objects.create(
+                author=user,
+                text=f'Пост {number}',
+                image=SimpleUploadedFile(
+                    f'small{number}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def thumbnail_queries(self):
+        """Запросы к таблице sorl при повторной отрисовке главной."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, ' 360w', count=10)
+        return [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.client.get(reverse('posts:index'))
+
+    def test_warm_cache_no_queries(self):
+        cache.clear()
+        self.assertEqual(self.thumbnail_queries(), [])
+
+    def test_metadata_survives_restart(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        queries = self.thumbnail_queries()
+        self.assertTrue(queries)
+        self.assertFalse(any(
+            query['sql'].startswith(('INSERT', 'UPDATE'))
+            for query in queries
+        ))
@@ -0,0 +1,110 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, User
+
+
+class SearchTests(TestCase):
+    """Поиск по индексу FTS5, который обновляется сигналами."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.apple = Post.objects.create(
+            author=self.user, text='Яблоко, ещё яблоко и снова яблоко'
+        )
+        self.pear = Post.objects.create(
+            author=self.user, text='Груша и одно яблоко'
+        )
+        self.plum = Post.objects.create(author=self.user, text='Слива')
+        Comment.objects.create(
+            post=self.plum, author=self.user, text='Вкуснее ёлочных груш'
+        )
+
+    def test_backend(self):
+        self.assertEqual(search.backend(), 'fts5')
+        with mock.patch.object(search, 'fts5_available', return_value=False):
+            with override_settings(SEARCH_BACKEND='fts5'):
+                with self.assertRaises(ImproperlyConfigured):
+                    search.backend()
+            self.assertEqual(search.backend(), 'python')
+
+    def test_ranked_results(self):
+        ids, next_cursor = search.search('яблоко')
+        self.assertEqual(ids, [self.apple.pk, self.pear.pk])
+        self.assertIsNone(next_cursor)
+
+    def test_prefix_diacritics_and_comments(self):
+        self.assertEqual(search.search('ЕЛОЧ')[0], [self.plum.pk])
+        self.assertEqual(
+            set(search.search('груш')[0]), {self.pear.pk, self.plum.pk}
+        )
+        self.assertEqual(search.search('груша яблоко')[0], [self.pear.pk])
+        self.assertEqual(search.search('  ,. ')[0], [])
+
+    def test_index_follows_changes(self):
+        self.pear.text = 'Персик'
+        self.pear.save()
+        self.assertEqual(search.search('яблоко')[0], [self.apple.pk])
+        self.assertEqual(search.search('персик')[0], [self.pear.pk])
+        self.plum.comments.all().delete()
+        self.assertEqual(search.search('груш')[0], [])
+        self.apple.delete()
+        self.assertEqual(search.search('яблоко')[0], [])
+
+    def test_cursor_pagination(self):
+        first, cursor = search.search('яблоко', limit=1)
+        second, end = search.search('яблоко', after=cursor, limit=1)
+        self.assertEqual(first + second, [self.apple.pk, self.pear.pk])
+        self.assertIsNone(end)
+        self.assertEqual(
+            search.search('яблоко', after='битый')[0],
+            [self.apple.pk, self.pear.pk]
+        )
+
+    def test_search_page(self):
+        response = Client().get(
+            reverse('posts:post_search'), {'q': 'яблоко'}
+        )
+        self.assertEqual(
+            response.context['posts'], [self.apple, self.pear]
+        )
+        self.assertContains(response, 'Груша и одно яблоко')
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        cases = (
+            ('admin:posts_post_changelist', {self.apple, self.pear}),
+            ('admin:posts_comment_changelist', set()),
+        )
+        for name, expected in cases:
+            with self.subTest(name=name):
+                response = client.get(reverse(name), {'q': 'яблок'})
+                self.assertEqual(
+                    set(response.context['cl'].result_list), expected
+                )
+
+    def test_rebuild_command(self):
+        search.clear()
+        self.assertEqual(search.search('слива')[0], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('слива')[0], [self.plum.pk])
+
+
+@override_settings(SEARCH_BACKEND='python')
+class PythonSearchTests(SearchTests):
+    """Те же сценарии на запасном индексе без FTS5."""
+
+    def test_backend(self):
+        self.assertEqual(search.backend(), 'python')
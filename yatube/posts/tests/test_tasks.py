@@ -0,0 +1,118 @@
+import json
+from datetime import timedelta
+
+from django.core import mail
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import tasks
+from core.models import Job
+
+from ..models import User
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def broken():
+    raise ValueError('сбой')
+
+
+class TaskQueueTests(TransactionTestCase):
+    """Очередь задач: приоритеты, захват, повторы и аренда."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_priority_order(self):
+        record.delay('обычная')
+        record.delay('срочная', priority=5)
+        self.assertEqual(tasks.run_pending(), 2)
+        self.assertEqual(calls, ['срочная', 'обычная'])
+        job = Job.objects.get(priority=5)
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(job.latency)
+
+    def test_delayed_job_waits(self):
+        record.delay('позже', delay=60)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_job_claimed_once(self):
+        record.delay('одна')
+        self.assertIsNotNone(tasks.claim('first'))
+        self.assertIsNone(tasks.claim('second'))
+
+    def test_expired_lease_reclaimed(self):
+        record.delay('потерянная')
+        tasks.claim('crashed')
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        self.assertEqual(tasks.run_pending('second'), 1)
+        self.assertEqual(calls, ['потерянная'])
+        self.assertEqual(Job.objects.get().attempts, 2)
+
+    def test_expired_lease_keeps_priority_order(self):
+        record.delay('обычная')
+        record.delay('срочная', priority=5)
+        tasks.claim('crashed')
+        Job.objects.filter(priority=5).update(
+            locked_until=timezone.now() - timedelta(1)
+        )
+        self.assertEqual(tasks.run_pending('second'), 2)
+        self.assertEqual(calls, ['срочная', 'обычная'])
+
+    def test_prune_keeps_recent_and_unfinished(self):
+        for value in ('старая', 'свежая', 'ждёт'):
+            record.delay(value)
+        tasks.run_pending()
+        Job.objects.filter(args=json.dumps(['старая'])).update(
+            finished=timezone.now() - timedelta(days=30)
+        )
+        Job.objects.filter(args=json.dumps(['ждёт'])).update(
+            status=Job.QUEUED, finished=None
+        )
+        with override_settings(TASKS_PRUNE_BATCH=1):
+            self.assertEqual(tasks.prune(), 1)
+        self.assertEqual(
+            sorted(json.loads(args)[0] for args in Job.objects.values_list(
+                'args', flat=True
+            )),
+            ['ждёт', 'свежая']
+        )
+
+    def test_retry_then_fail(self):
+        broken.delay()
+        self.assertEqual(tasks.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('сбой', job.error)
+        self.assertGreater(job.run_at, timezone.now())
+        Job.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+class QueuedEmailTests(TransactionTestCase):
+
+    def test_password_reset_email_queued(self):
+        User.objects.create_user(
+            username='auth', email='auth@example.com', password='secret'
+        )
+        self.client.post(
+            reverse('users:password_reset'),
+            {'email': 'auth@example.com'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['auth@example.com'])
@@ -3,11 +3,16 @@ import tempfile
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Group, Post, User
+from ..models import Comment, Group, Post, User
+from ..thumbnails import FORMATS
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -75,6 +80,7 @@ class PostViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -116,6 +122,25 @@ class PostViewsTests(TestCase):
                 with self.subTest(reverse_name=reverse_name):
                     self.assertEqual(response_name, reverse_name)
 
+    def test_post_image_srcset(self):
+        """
+        Изображение поста выводится через srcset с размерами кадра
+        и цветом-заглушкой из полей поста.
+        """
+        for reversed, arg_list in self.index_views.items():
+            with self.subTest(reversed=reversed):
+                response = self.guest_client.get(
+                    reverse(reversed, kwargs=arg_list)
+                )
+                self.assertContains(response, ' 360w')
+                self.assertContains(response, 'width="360" height="127"')
+                self.assertContains(response, 'loading="lazy"')
+                self.assertContains(response, self.post.image_placeholder)
+                self.assertEqual(
+                    'image/webp' in response.content.decode(),
+                    'WEBP' in FORMATS
+                )
+
     def test_post_detail_context(self):
         """Проверка контекста страницы поста."""
         response = self.authorized_client.get(
@@ -172,6 +197,7 @@ class PaginatorViewsTest(TestCase):
         }
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_first_page_contains_ten_records(self):
@@ -193,6 +219,45 @@ class PaginatorViewsTest(TestCase):
                 ) + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 5)
 
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсоры «старее»/«новее» обходят ленту без пропусков."""
+        for reversed, arg_list in self.pag_views.items():
+            with self.subTest(reversed=reversed):
+                url = reverse(reversed, kwargs=arg_list)
+                first = self.guest_client.get(url).context['page_obj']
+                self.assertIsNone(first.previous_cursor)
+                second = self.guest_client.get(
+                    url, {'after': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 5)
+                self.assertIsNone(second.next_cursor)
+                self.assertEqual(
+                    {post.id for post in first} | {post.id for post in second},
+                    set(Post.objects.values_list('id', flat=True))
+                )
+                back = self.guest_client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in back],
+                    [post.id for post in first]
+                )
+
+    def test_cursor_pages_do_not_count(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        url = reverse('posts:group_posts', kwargs={'slug': self.group.slug})
+        first = self.guest_client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url, {'after': first.next_cursor})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'garbage'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
 
 class GroupViewsTests(TestCase):
     """Проверка на правильное отображение поста с группой"""
@@ -228,6 +293,7 @@ class GroupViewsTests(TestCase):
         }
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -256,3 +322,81 @@ class GroupViewsTests(TestCase):
             response.context.get('page_obj')[0].group.slug,
             self.group.slug
         )
+
+
+class CommentsPaginationTests(TestCase):
+    """Комментарии к посту отдаются курсорными страницами."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(25)
+        )
+        cls.comments_url = reverse(
+            'posts:post_comments',
+            kwargs={'post_id': cls.post.id}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_post_detail_renders_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertEqual(len(response.context['comments']), 20)
+        self.assertIsNotNone(response.context['comments_page'].next_cursor)
+
+    def test_comments_endpoint_pages(self):
+        first = self.guest_client.get(self.comments_url).json()
+        second = self.guest_client.get(
+            self.comments_url, {'after': first['next']}
+        ).json()
+        self.assertEqual(len(first['results']), 20)
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            [comment['text'] for comment in first['results'][:2]],
+            ['Комментарий 0', 'Комментарий 1']
+        )
+
+    def test_comments_since(self):
+        last = Comment.objects.order_by('created', 'id').last()
+        new = Comment.objects.create(
+            post=self.post, author=self.user, text='Новый'
+        )
+        response = self.guest_client.get(
+            self.comments_url, {'since': last.created.isoformat()}
+        ).json()
+        self.assertIn(new.id, [c['id'] for c in response['results']])
+        self.assertNotIn(last.id, [c['id'] for c in response['results']])
+
+    def test_comments_since_offset_and_errors(self):
+        last = Comment.objects.order_by('created', 'id').last()
+        moment = timezone.localtime(
+            last.created, timezone.get_fixed_timezone(180)
+        ).isoformat()
+        self.assertIn('+03:00', moment)
+        response = self.guest_client.get(
+            f'{self.comments_url}?since={moment}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            last.id, [c['id'] for c in response.json()['results']]
+        )
+        response = self.guest_client.get(
+            self.comments_url, {'since': 'вчера'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.json()['detail'])
+
+    def test_comments_endpoint_unknown_post(self):
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
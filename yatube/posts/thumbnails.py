@@ -0,0 +1,63 @@
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.tasks import task
+
+from .models import Post
+
+# Ширины вариантов изображения поста для srcset; пропорции кадра 960x339.
+WIDTHS = (360, 720, 960)
+RATIO = 339 / 960
+OPTIONS = {'crop': 'center', 'upscale': True}
+# WebP отдаётся браузерам, которые его поддерживают, если Pillow собран
+# с libwebp; JPEG остаётся запасным вариантом для всех остальных.
+FORMATS = (('WEBP',) if features.check('webp') else ()) + ('JPEG',)
+
+
+def geometry(width):
+    return f'{width}x{round(width * RATIO)}'
+
+
+def widths_for(image_width):
+    """
+    Ширины вариантов для картинки шириной image_width: шире исходной
+    не растягиваем, самый узкий вариант строится всегда.
+    """
+    if not image_width:
+        return WIDTHS
+    return tuple(
+        width for width in WIDTHS
+        if width <= image_width or width == WIDTHS[0]
+    )
+
+
+def sizes(image_width=None):
+    """Все миниатюры, которые выводит тег {% post_picture %}."""
+    return [
+        (geometry(width), {**OPTIONS, 'format': image_format})
+        for image_format in FORMATS
+        for width in widths_for(image_width)
+    ]
+
+
+@task
+def generate(name, image_width=None):
+    """
+    Строит заранее миниатюры файла изображения name, чтобы отрисовка
+    ленты только находила готовые файлы. Источник открывается
+    в хранилище поля Post.image: sorl различает миниатюры по хранилищу
+    источника, и {% post_picture %} ищет их именно там.
+    """
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    for size, options in sizes(image_width):
+        get_thumbnail(source, size, **options)
+
+
+def schedule(post):
+    """
+    Ставит построение миниатюр изображения поста в очередь задач,
+    чтобы не задерживать ответ.
+    """
+    if post.image:
+        generate.delay(post.image.name, post.image_width)
@@ -1,7 +1,7 @@
 
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'posts'
 
@@ -20,11 +20,26 @@ urlpatterns = [
         views.profile,
         name='profile'
     ),
+    path(
+        'profile/<str:username>/export/',
+        views.profile_export,
+        name='profile_export'
+    ),
+    path(
+        'group/<slug:slug>/export/',
+        views.group_export,
+        name='group_export'
+    ),
     path(
         'posts/<int:post_id>/',
         views.post_detail,
         name='post_detail'
     ),
+    path(
+        'search/',
+        views.post_search,
+        name='post_search'
+    ),
     path(
         'create/',
         views.post_create,
@@ -35,6 +50,11 @@ urlpatterns = [
         views.post_edit,
         name='post_edit'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
@@ -55,4 +75,54 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'api/v1/posts/',
+        api.posts,
+        name='api_posts'
+    ),
+    path(
+        'api/v1/posts/<int:post_id>/',
+        api.post_detail,
+        name='api_post_detail'
+    ),
+    path(
+        'api/v1/groups/<slug:slug>/posts/',
+        api.group_posts,
+        name='api_group_posts'
+    ),
+    path(
+        'api/v1/authors/<str:username>/posts/',
+        api.author_posts,
+        name='api_author_posts'
+    ),
+    path(
+        'feeds/rss/',
+        feeds.index_rss,
+        name='index_rss'
+    ),
+    path(
+        'feeds/atom/',
+        feeds.index_atom,
+        name='index_atom'
+    ),
+    path(
+        'group/<slug:slug>/rss/',
+        feeds.group_rss,
+        name='group_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feeds.group_atom,
+        name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.author_rss,
+        name='author_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.author_atom,
+        name='author_atom'
+    ),
 ]
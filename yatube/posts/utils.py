@@ -0,0 +1,149 @@
+import re
+from itertools import islice
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.paginator import CursorPaginator
+
+from . import cache
+
+POST_LIMIT = 10
+COMMENT_LIMIT = 20
+# Время и смещение часового пояса, «+» которого стал пробелом.
+OFFSET_SPACE_RE = re.compile(r'(\d:\d\d(?:\.\d+)?) (\d\d(?::?\d\d)?)$')
+
+
+def paginate(request, post_list, paginator_class=CursorPaginator, **kwargs):
+    """
+    Страница ленты постов.
+
+    Основной режим — курсорный (?after=/?before=), номер страницы
+    ?page=N поддерживается для старых ссылок.
+    """
+    paginator = paginator_class(post_list, POST_LIMIT, **kwargs)
+    return get_page(request, paginator)
+
+
+def get_page(request, paginator):
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        return paginator.get_page(page_number)
+    return paginator.cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+
+def page_request(request, paginator):
+    """
+    Запрошенная страница в каноническом виде: ('page', номер),
+    ('before', курсор) или ('after', курсор); ('after', None) — первая
+    страница. Битые номера и курсоры ведут туда же, куда get_page(),
+    поэтому мусорные параметры не плодят записей в кеше.
+    """
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        try:
+            return 'page', paginator.validate_number(page_number)
+        except PageNotAnInteger:
+            return 'page', 1
+        except EmptyPage:
+            return 'page', paginator.num_pages
+    before = paginator.normalize_cursor(request.GET.get('before'))
+    if before:
+        return 'before', before
+    return 'after', paginator.normalize_cursor(request.GET.get('after'))
+
+
+def paginate_cached(request, post_list, scope, version):
+    """
+    paginate() с кешированием страницы под версией ленты.
+
+    При попадании страница собирается из кеша без обращения к базе.
+    Ключ строится по нормализованному запросу (page_request()),
+    для проверки номера страницы число записей тоже берётся из кеша.
+    Авторы постов загружаются без невыводимых полей.
+    """
+    paginator = CursorPaginator(
+        post_list.defer(*cache.hidden_user_fields('author__')), POST_LIMIT
+    )
+    if 'page' in request.GET:
+        paginator.count = cache.get_or_set(
+            'feed-count', version, [scope], lambda: paginator.count
+        )
+    kind, value = page_request(request, paginator)
+
+    def build():
+        if kind == 'page':
+            page = paginator.get_page(value)
+        else:
+            page = paginator.cursor_page(**{kind: value})
+        return (
+            list(page.object_list),
+            page.number,
+            page.next_cursor,
+            page.previous_cursor,
+        )
+
+    object_list, number, next_cursor, previous_cursor = cache.get_or_set(
+        'feed-page', version, [scope, kind, value], build
+    )
+    page = Page(object_list, number, paginator)
+    page.next_cursor = next_cursor
+    page.previous_cursor = previous_cursor
+    page.cache_key = f'{kind}:{value}'
+    return page
+
+
+def paginate_comments(comments, after=None):
+    """Курсорная страница комментариев в порядке публикации."""
+    paginator = CursorPaginator(
+        comments.select_related('author'),
+        COMMENT_LIMIT,
+        key='created',
+        descending=False
+    )
+    return paginator.cursor_page(after=after)
+
+
+def comment_as_dict(comment):
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def parse_since(value):
+    """
+    Момент времени из параметра ?since= или None, если он не задан.
+
+    Незакодированный «+» смещения приходит в строке запроса пробелом
+    («...T10:00:00 03:00»), такой пробел снова читается как «+».
+    Для нераспознанной даты — ValueError.
+    """
+    if not value:
+        return None
+    value = OFFSET_SPACE_RE.sub(r'\1+\2', value)
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise ValueError(f'since — не дата и время ISO 8601: {value}')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def chunked(iterable, size):
+    """Списки по size элементов из iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
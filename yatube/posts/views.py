@@ -1,45 +1,86 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from core import page_cache
+from core.decorators import query_budget
+from core.paginator import MergedCursorPaginator
 
-POST_LIMIT = 10
+from . import cache, exporter, feed, search, thumbnails
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post, User
+from .utils import (POST_LIMIT, comment_as_dict, paginate, paginate_cached,
+                    paginate_comments, parse_since)
 
 
+@cache.conditional(cache.index_version)
+@page_cache.cache_anonymous
+@query_budget(3)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, POST_LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    version = cache.index_version()
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = paginate_cached(request, post_list, 'index', version)
     title = 'Последние обновления на сайте'
     context = {
         'title': title,
         'page_obj': page_obj,
+        'cache_version': version,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, 'posts/index.html', context)
+    response = render(request, 'posts/index.html', context)
+    return page_cache.add_keys(response, cache.page_keys(page_obj, 'feed'))
 
 
+@cache.conditional(cache.group_version)
+@page_cache.cache_anonymous
+@query_budget(4)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, POST_LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    version = cache.group_version(slug)
+    group = cache.get_or_set(
+        'group', version, [slug],
+        partial(get_object_or_404, Group, slug=slug)
+    )
+    post_list = group.posts.select_related('author', 'group')
+    page_obj = paginate_cached(request, post_list, f'group:{slug}', version)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': version,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, 'posts/group_list.html', context)
+    response = render(request, 'posts/group_list.html', context)
+    return page_cache.add_keys(
+        response, cache.page_keys(
+            page_obj, f'group-{group.pk}', f'group-{group.pk}-list'
+        )
+    )
 
 
+@cache.conditional(cache.author_version)
+@page_cache.cache_anonymous
+@query_budget(5)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, POST_LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    version = cache.author_version(username)
+    author = cache.get_or_set(
+        'author', version, [username],
+        partial(
+            get_object_or_404,
+            User.objects.select_related('stats').defer(
+                *cache.hidden_user_fields()
+            ),
+            username=username
+        )
+    )
+    post_list = author.posts.select_related('author', 'group')
+    page_obj = paginate_cached(
+        request, post_list, f'author:{username}', version
+    )
     following = request.user.is_authenticated and (
         Follow.objects.filter(
             user=request.user,
@@ -50,29 +91,117 @@ def profile(request, username):
         'following': following,
         'author': author,
         'page_obj': page_obj,
+        'cache_version': version,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, 'posts/profile.html', context)
+    response = render(request, 'posts/profile.html', context)
+    return page_cache.add_keys(
+        response, cache.page_keys(
+            page_obj, f'author-{author.pk}', f'author-{author.pk}-list'
+        )
+    )
 
 
+@cache.conditional(cache.post_version)
+@page_cache.cache_anonymous
+@query_budget(4)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
+    comments_page = paginate_comments(
+        post.comments.all(),
+        after=request.GET.get('after')
+    )
     form = CommentForm()
     context = {
         'post': post,
-        'comments': comments,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
         'form': form,
     }
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    return page_cache.add_keys(
+        response, cache.post_keys(post) | {f'comments-{post.pk}'}
+    )
+
+
+@query_budget(3)
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    post_ids, next_cursor = search.search(
+        query, after=request.GET.get('after'), limit=POST_LIMIT
+    )
+    posts = Post.objects.select_related('author', 'group').in_bulk(post_ids)
+    context = {
+        'query': query,
+        'posts': [posts[pk] for pk in post_ids if pk in posts],
+        'next_cursor': next_cursor,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(2)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = post.comments.all()
+    try:
+        since = parse_since(request.GET.get('since'))
+    except ValueError as error:
+        return JsonResponse({'detail': str(error)}, status=400)
+    if since is not None:
+        comments = comments.filter(created__gt=since)
+    page = paginate_comments(comments, after=request.GET.get('after'))
+    return JsonResponse({
+        'results': [comment_as_dict(comment) for comment in page],
+        'next': page.next_cursor,
+    })
+
+
+def export_options(request):
+    """Формат выгрузки из ?format= и нужно ли добавлять картинки."""
+    format = request.GET.get('format', 'jsonl')
+    if format not in exporter.LINES:
+        format = 'jsonl'
+    return {'format': format, 'images': request.GET.get('images') == '1'}
 
 
 @login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        raise PermissionDenied
+    return exporter.export_response(
+        f'yatube-{author.username}',
+        posts=author.posts.all(),
+        comments=author.comments.all(),
+        **export_options(request)
+    )
+
+
+@staff_member_required
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts = group.posts.all()
+    return exporter.export_response(
+        f'yatube-group-{group.slug}',
+        posts=posts,
+        comments=Comment.objects.filter(post__in=posts.values('pk')),
+        **export_options(request)
+    )
+
+
+@login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', username=request.user)
     context = {
         'form': form
@@ -92,6 +221,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -102,6 +233,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -114,22 +246,28 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(4)
 def follow_index(request):
     following = Follow.objects.filter(user=request.user)
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, POST_LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request,
+        feed.feed_sources(request.user),
+        paginator_class=MergedCursorPaginator,
+        key='feed_pub_date',
+        tiebreaker='feed_post_id',
+    )
     title = 'Избранные авторы'
     context = {
         'title': title,
         'following': following,
         'page_obj': page_obj,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -138,6 +276,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     unfollow = Follow.objects.filter(user=request.user, author=author)
@@ -113,3 +113,67 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Посты авторов, у которых подписчиков больше этого числа, не раскладываются
+# по лентам при публикации, а подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 1000
+
+# Превышение бюджета запросов (core.decorators.query_budget)
+# вызывает исключение вместо записи в лог.
+QUERY_BUDGET_STRICT = False
+
+# Время жизни фрагментов лент в кеше. Актуальность обеспечивают версии
+# ключей, которые обновляются сигналами при изменении постов, групп
+# и пользователей (posts.cache).
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Полностраничный кеш ответов анонимным пользователям (core.page_cache).
+# Страницы очищаются по суррогатным ключам из заголовка Surrogate-Key;
+# на адреса SURROGATE_PURGE_URLS (например, внешнего прокси) при этом
+# уходит запрос PURGE с теми же ключами.
+PAGE_CACHE_TIMEOUT = 60 * 60
+SURROGATE_PURGE_URLS = []
+SURROGATE_PURGE_TIMEOUT = 2
+
+# Очередь отложенных задач (core.tasks). Задачи выполняет отдельный
+# процесс: python manage.py run_worker; обработчиков может быть несколько.
+TASKS_MAX_ATTEMPTS = 3
+# Базовая задержка повтора в секундах, удваивается с каждой попыткой.
+TASKS_RETRY_DELAY = 10
+# Через сколько секунд задачу упавшего обработчика заберёт другой.
+TASKS_LEASE = 300
+TASKS_POLL_INTERVAL = 1
+TASKS_CLAIM_BATCH = 10
+# Выполненные задачи хранятся столько секунд; обработчик удаляет
+# устаревшие раз в TASKS_PRUNE_INTERVAL секунд.
+TASKS_RETENTION = 7 * 24 * 60 * 60
+TASKS_PRUNE_INTERVAL = 60 * 60
+TASKS_PRUNE_BATCH = 1000
+
+# Ограничения загружаемых изображений постов (posts.images).
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+# Изображения с большим числом пикселей отклоняются до декодирования.
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+# Сумма пикселей всех кадров анимации: каждый кадр декодируется.
+POST_IMAGE_MAX_ANIMATION_PIXELS = 20 * 10 ** 6
+# Длинная сторона сохранённого изображения.
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_QUALITY = 85
+# Файл без ссылок удаляется не раньше, чем через столько секунд после
+# последней загрузки того же содержимого (posts.images.release).
+POST_IMAGE_RELEASE_GRACE = 60 * 60
+
+# Метаданные миниатюр sorl-thumbnail: LRU процесса поверх кеша проекта
+# и базы данных (core.kvstore).
+THUMBNAIL_KVSTORE = 'core.kvstore.KVStore'
+THUMBNAIL_LRU_SIZE = 5000
+THUMBNAIL_LRU_TIMEOUT = 60 * 5
+
+# Поисковый индекс постов и комментариев (posts.search): 'fts5' — таблица
+# SQLite FTS5, 'python' — запасной индекс слов в обычной таблице,
+# 'auto' — FTS5, если он доступен. После смены индекса его нужно
+# заполнить: python manage.py rebuild_search_index.
+SEARCH_BACKEND = 'auto'
+
+# Сколько записей выгрузки (posts.exporter) читать из базы за раз.
+EXPORT_CHUNK_SIZE = 2000